@@ -0,0 +1,145 @@
+"""
+Check of `links.link.checker.LinkChecker` against a local stand-in HTTP server.
+
+The server (`http.server` on a free local port) answers every path differently:
+plain 200, 405 to HEAD (GET fallback), broken status line to HEAD (GET fallback),
+404, slow answer and no answer until the client times out. Several links of the
+same host are probed with `--host-interval` spacing, their latencies must still be
+the latencies of the server, not of waiting for the host rate limit. Exits with
+status 1 when any expectation fails.
+
+Usage (from pylinks directory)::
+    python -m benchmarks.checker --host-interval 0.2 --timeout 0.5
+"""
+
+import argparse
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Response delay of /slow and of /hang (relative to client timeout), seconds.
+SLOW_SECONDS = 0.1
+# Latency over this (ms) is not server time of a fast path.
+FAST_LATENCY_MS = 50
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+
+    # (method, path) of every received request.
+    requests = []
+    hang_seconds = 1
+
+    def _answer(self, status):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def _handle(self):
+        self.requests.append((self.command, self.path))
+        path = self.path.split('?')[0]
+        if path == '/ok':
+            self._answer(200)
+        elif path == '/no-head':
+            self._answer(405 if self.command == 'HEAD' else 200)
+        elif path == '/broken-head':
+            if self.command == 'HEAD':
+                self.wfile.write(b'GARBAGE\r\n\r\n')
+                self.close_connection = True
+            else:
+                self._answer(200)
+        elif path == '/slow':
+            time.sleep(SLOW_SECONDS)
+            self._answer(200)
+        elif path == '/hang':
+            time.sleep(self.hang_seconds)
+            self._answer(200)
+        else:
+            self._answer(404)
+
+    do_HEAD = _handle
+    do_GET = _handle
+
+    def log_message(self, *args):
+        pass
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    arg_parser.add_argument('--host-interval', type=float, default=0.2)
+    arg_parser.add_argument('--timeout', type=float, default=0.5)
+    arg_parser.add_argument('--same-host-links', type=int, default=4)
+    options = arg_parser.parse_args()
+
+    from links.link.checker import LinkChecker
+
+    StandInHandler.hang_seconds = options.timeout * 2
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = 'http://127.0.0.1:{}'.format(server.server_address[1])
+
+    # path -> (expected status, expected methods, latency check)
+    fast = lambda latency: latency < FAST_LATENCY_MS
+    cases = {
+        '/no-head': (200, ['HEAD', 'GET'], fast),
+        '/broken-head': (200, ['HEAD', 'GET'], fast),
+        '/missing': (404, ['HEAD', 'GET'], fast),
+        '/slow': (200, ['HEAD'], lambda latency: latency >= SLOW_SECONDS * 1000),
+        '/hang': (None, ['HEAD'], lambda latency: latency < options.timeout * 1000 * 1.5),
+    }
+    for i in range(options.same_host_links):
+        cases['/ok?{}'.format(i)] = (200, ['HEAD'], fast)
+    links = [(i, base + path) for i, path in enumerate(cases)]
+    refused_url = 'http://127.0.0.1:{}/'.format(free_port())
+    links.append((len(links), refused_url))
+
+    checker = LinkChecker(concurrency=len(links), timeout=options.timeout,
+                          host_interval=options.host_interval)
+    start = time.perf_counter()
+    results = checker.check(links)
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+
+    failures = []
+    print('{:<16} {:>6} {:>11}  {:<12} {}'.format('path', 'status', 'latency ms', 'methods',
+                                                 'error'))
+    for (link_id, url), result in zip(links, results):
+        if url == refused_url:
+            path, methods = 'refused', []
+            expected_status, expected_methods, latency_ok = None, [], fast
+        else:
+            path = url[len(base):]
+            methods = [method for method, request_path in StandInHandler.requests
+                       if request_path == path]
+            expected_status, expected_methods, latency_ok = cases[path]
+        print('{:<16} {:>6} {:>11.1f}  {:<12} {}'.format(
+            path, str(result.status), result.latency, ','.join(methods), result.error or ''))
+        if result.status != expected_status:
+            failures.append('{}: status {} instead of {}'.format(
+                path, result.status, expected_status))
+        if methods != expected_methods:
+            failures.append('{}: requests {} instead of {}'.format(
+                path, methods, expected_methods))
+        if not latency_ok(result.latency):
+            failures.append('{}: latency {} ms'.format(path, result.latency))
+        if (expected_status is None) != (result.error is not None):
+            failures.append('{}: error {!r}'.format(path, result.error))
+    print('checked {} links in {:.2f} s'.format(len(links), elapsed))
+
+    if failures:
+        for failure in failures:
+            print('FAIL', failure)
+        sys.exit(1)
+    print('All checks passed.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark of response compression: size and time of a full link page (and of the same
+page streamed chunk by chunk) for gzip levels and brotli qualities.
+
+Usage (from pylinks directory)::
+    python -m benchmarks.compression --links 1000 --repeat 20
+"""
+
+import argparse
+import os
+import tempfile
+
+from benchmarks.serialization import timed
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    arg_parser.add_argument('--database-uri', default=os.environ.get('DATABASE_URI'))
+    arg_parser.add_argument('--links', type=int, default=1000, help='links on one page')
+    arg_parser.add_argument('--repeat', type=int, default=20)
+    options = arg_parser.parse_args()
+
+    temporary = None
+    if not options.database_uri:
+        temporary = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        options.database_uri = 'sqlite:///{}'.format(temporary.name)
+    # configuration is read at import time
+    os.environ['DATABASE_URI'] = options.database_uri
+
+    from links import create_app, db
+    from links.link.models import Category, Link, link_row_serializer, link_rows_query
+    from lib import compress
+    from lib.response import dumps, json_array_chunks
+
+    app = create_app(modules=[])
+    try:
+        with app.app_context():
+            db.create_all()
+            if Link.query.count() < options.links:
+                db.session.execute(Category.__table__.insert(), [{"name": "bench-compress"}])
+                category = Category.query.filter_by(name="bench-compress").first()
+                db.session.execute(Link.__table__.insert(), [{
+                    "name": "compress {}".format(i),
+                    "link": "https://compress.example.com/{}".format(i),
+                    "category_id": category.id,
+                } for i in range(options.links)])
+                db.session.commit()
+            rows = link_rows_query().order_by(Link.id).limit(options.links).all()
+            links = [link_row_serializer(row) for row in rows]
+    finally:
+        if temporary is not None:
+            os.unlink(temporary.name)
+
+    body = dumps({"status": 200, "data": {"links": links}}).encode('utf-8')
+    chunks = list(json_array_chunks(links))
+    variants = [('gzip', 'COMPRESSION_GZIP_LEVEL', level) for level in (1, 6, 9)]
+    if compress.brotli is not None:
+        variants.extend(('br', 'COMPRESSION_BROTLI_QUALITY', quality) for quality in (1, 4, 11))
+
+    print('{:<16} {:>10} {:>7} {:>9} {:>10} {:>9}'.format(
+        'encoding ({} links)'.format(options.links), 'bytes', 'ratio', 'ms',
+        'stream B', 'stream ms'))
+    print('{:<16} {:>10} {:>7.2f} {:>9} {:>10} {:>9}'.format(
+        'identity', len(body), 1, '-', sum(len(chunk) for chunk in chunks), '-'))
+    for encoding, setting, level in variants:
+        app.config[setting] = level
+        compress.init_app(app)
+        compressed = compress.compress(body, encoding)
+        streamed = b''.join(compress.compress_chunks(chunks, encoding))
+        print('{:<16} {:>10} {:>7.2f} {:>9.2f} {:>10} {:>9.2f}'.format(
+            '{} {}'.format(encoding, level), len(compressed), len(body) / len(compressed),
+            timed(lambda: compress.compress(body, encoding), options.repeat) * 1000,
+            len(streamed),
+            timed(lambda: b''.join(compress.compress_chunks(chunks, encoding)),
+                  options.repeat) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,296 @@
+"""
+Load and latency benchmark of all endpoints of `links.link.resources`.
+
+Seeds database (temporary SQLite file unless --database-uri or DATABASE_URI is given)
+with configurable number of categories and links and drives every endpoint through
+Flask test client from `--concurrency` threads. For every endpoint p50/p95/p99 latency,
+throughput, errors and SQL statements per request are reported.
+
+Results are saved as json (--output), pass file of previous run as --compare
+to print relative change of p50 and throughput.
+
+Usage (from pylinks directory)::
+    python -m benchmarks.endpoints --links 100000 --categories 500 --concurrency 1 4 \\
+        --output bench.json --compare previous.json
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from itertools import count
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class StatementCounter:
+    """
+    Counts SQL statements executed by current thread.
+    """
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self._local = threading.local()
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+
+    def _before_cursor_execute(self, *args):
+        self._local.count = getattr(self._local, 'count', 0) + 1
+
+    def reset(self):
+        self._local.count = 0
+
+    @property
+    def value(self):
+        return getattr(self._local, 'count', 0)
+
+
+def seed(db, Category, Link, categories, links, batch=5000):
+    from lib.urls import url_hash
+    if Link.query.count() >= links:
+        return
+    rnd = random.Random(0)
+    rows = [{"id": 1, "name": "bench-root", "parent_id": None}]
+    rows.extend({"id": i, "name": "bench-cat-{}".format(i), "parent_id": rnd.randint(1, i - 1)}
+                for i in range(2, categories + 1))
+    db.session.execute(Category.__table__.insert(), rows)
+    for start in range(0, links, batch):
+        urls = ["https://bench{}.example.com/page/{}".format(i % 97, i)
+                for i in range(start, min(start + batch, links))]
+        db.session.execute(Link.__table__.insert(), [{
+            "name": "bench link {}".format(start + i),
+            "link": url,
+            "url_hash": url_hash(url),
+            "category_id": rnd.randint(1, categories),
+        } for i, url in enumerate(urls)])
+    db.session.commit()
+
+
+def endpoints(options):
+    """
+    List of (name, request factory) pairs, factory returns (method, url, json body)
+    for n-th request.
+    """
+    unique = count()
+    links = options.links
+    categories = options.categories
+    prefix = '/api/v1'
+
+    def new_link():
+        n = next(unique)
+        return {"name": "new {}-{}".format(os.getpid(), n),
+                "link": "https://new.example.com/{}/{}".format(os.getpid(), n),
+                "categoryId": 1}
+
+    deep_after = None
+    if links > options.limit * 10:
+        from lib.query import encode_cursor
+        deep_after = encode_cursor([links - options.limit * 2])
+
+    result = [
+        ("GET /links", lambda i: ("GET", prefix + "/links?limit={}".format(options.limit), None)),
+        ("GET /links?offset", lambda i: (
+            "GET", prefix + "/links?limit={}&offset={}".format(
+                options.limit, max(1, links - options.limit * 2)), None)),
+        ("GET /links?stream", lambda i: (
+            "GET", prefix + "/links?stream=true&limit={}".format(options.limit), None)),
+        ("GET /links/<id>", lambda i: (
+            "GET", prefix + "/links/{}".format(i % links + 1), None)),
+        ("GET /links?ids", lambda i: (
+            "GET", prefix + "/links?ids={}".format(",".join(
+                str((i + j * 97) % links + 1) for j in range(min(options.limit, 100)))), None)),
+        ("POST /links/batch", lambda i: (
+            "POST", prefix + "/links/batch",
+            {"ids": [(i + j * 97) % links + 1 for j in range(min(options.limit, 100))]})),
+        ("GET /links/lookup", lambda i: (
+            "GET", prefix + "/links/lookup?url=HTTPS://bench{}.example.com/page/{}/".format(
+                i % links % 97, i % links), None)),
+        ("GET /links/search", lambda i: (
+            "GET", prefix + "/links/search?q=bench{}".format(i % 97), None)),
+        ("GET /categories", lambda i: (
+            "GET", prefix + "/categories?limit={}".format(options.limit), None)),
+        ("GET /categories?ids", lambda i: (
+            "GET", prefix + "/categories?ids={}".format(",".join(
+                str((i + j * 7) % categories + 1) for j in range(min(categories, 100)))),
+            None)),
+        ("POST /categories/batch", lambda i: (
+            "POST", prefix + "/categories/batch",
+            {"ids": [(i + j * 7) % categories + 1 for j in range(min(categories, 100))]})),
+        ("GET /categories/<id>", lambda i: (
+            "GET", prefix + "/categories/{}".format(i % categories + 1), None)),
+        ("GET /categories/<id>/subtree", lambda i: (
+            "GET", prefix + "/categories/{}/subtree".format(i % categories + 1), None)),
+        ("GET /categories/<id>/path", lambda i: (
+            "GET", prefix + "/categories/{}/path".format(i % categories + 1), None)),
+        ("GET /categories/<id>/stats", lambda i: (
+            "GET", prefix + "/categories/{}/stats".format(i % categories + 1), None)),
+        ("GET /changes", lambda i: ("GET", prefix + "/changes?limit=100", None)),
+        ("POST /links", lambda i: ("POST", prefix + "/links", new_link())),
+        ("POST /links/bulk", lambda i: (
+            "POST", prefix + "/links/bulk", {"links": [new_link() for _ in range(100)]})),
+        ("PUT /links/<id>", lambda i: ("PUT", prefix + "/links/{}".format(i % links + 1),
+                                       new_link())),
+        ("DELETE /links/<id>", lambda i: (
+            "DELETE", prefix + "/links/{}".format(links - i % links), None)),
+        ("POST /categories", lambda i: (
+            "POST", prefix + "/categories",
+            {"name": "new cat {}-{}".format(os.getpid(), next(unique)), "parentId": 1})),
+        # Root is not moved or deleted, moving under the root never makes a cycle.
+        ("PUT /categories/<id>", lambda i: (
+            "PUT", prefix + "/categories/{}".format(i % (categories - 1) + 2),
+            {"name": "put cat {}-{}".format(os.getpid(), next(unique)), "parentId": 1})),
+        ("DELETE /categories/<id>", lambda i: (
+            "DELETE", prefix + "/categories/{}".format(categories - i % (categories - 1)),
+            None)),
+    ]
+    if deep_after is not None:
+        result.insert(2, ("GET /links?after", lambda i: (
+            "GET", prefix + "/links?limit={}&after={}".format(options.limit, deep_after), None)))
+    if options.export:
+        result.append(("GET /links/export", lambda i: ("GET", prefix + "/links/export", None)))
+    return result
+
+
+def run_endpoint(app, counter, factory, requests, concurrency):
+    latencies = []
+    statements = []
+    errors = [0]
+    lock = threading.Lock()
+    sequence = count()
+
+    def worker():
+        client = app.test_client()
+        local_latencies = []
+        local_statements = []
+        local_errors = 0
+        while True:
+            i = next(sequence)
+            if i >= requests:
+                break
+            method, url, body = factory(i)
+            counter.reset()
+            start = time.perf_counter()
+            with client.open(url, method=method, json=body) as response:
+                response.get_data()
+                status = response.status_code
+            local_latencies.append(time.perf_counter() - start)
+            local_statements.append(counter.value)
+            if status >= 400:
+                local_errors += 1
+        with lock:
+            latencies.extend(local_latencies)
+            statements.extend(local_statements)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    result = {"p{}Ms".format(pct): round(percentile(latencies, pct) * 1000, 3)
+              for pct in PERCENTILES}
+    result.update({
+        "requests": requests,
+        "errors": errors[0],
+        "throughput": round(requests / elapsed, 1) if elapsed else 0.0,
+        "sqlPerRequest": round(sum(statements) / len(statements), 2) if statements else 0.0,
+    })
+    return result
+
+
+def print_results(results, previous):
+    header = '{:<30} {:>4} {:>9} {:>9} {:>9} {:>9} {:>7} {:>6}'.format(
+        'endpoint', 'conc', 'p50 ms', 'p95 ms', 'p99 ms', 'req/s', 'sql/req', 'errors')
+    if previous:
+        header += ' {:>9} {:>9}'.format('p50 diff', 'rps diff')
+    print(header)
+    for key, result in results.items():
+        name, concurrency = key.rsplit('@', 1)
+        line = '{:<30} {:>4} {:>9.2f} {:>9.2f} {:>9.2f} {:>9.1f} {:>7.2f} {:>6}'.format(
+            name, concurrency, result["p50Ms"], result["p95Ms"], result["p99Ms"],
+            result["throughput"], result["sqlPerRequest"], result["errors"])
+        old = previous.get(key) if previous else None
+        if old:
+            line += ' {:>+8.1f}% {:>+8.1f}%'.format(
+                (result["p50Ms"] / old["p50Ms"] - 1) * 100 if old["p50Ms"] else 0.0,
+                (result["throughput"] / old["throughput"] - 1) * 100 if old["throughput"] else 0.0)
+        print(line)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    arg_parser.add_argument('--database-uri', default=os.environ.get('DATABASE_URI'))
+    arg_parser.add_argument('--links', type=int, default=10000)
+    arg_parser.add_argument('--categories', type=int, default=200)
+    arg_parser.add_argument('--limit', type=int, default=100, help='page size of list endpoints')
+    arg_parser.add_argument('--requests', type=int, default=200,
+                            help='requests per endpoint and concurrency level')
+    arg_parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4])
+    arg_parser.add_argument('--only', nargs='+', default=None,
+                            help='run only endpoints with name containing one of these strings')
+    arg_parser.add_argument('--cache', action='store_true', help='keep response cache enabled')
+    arg_parser.add_argument('--export', action='store_true', help='include full /links/export')
+    arg_parser.add_argument('--output', help='save results as json into this file')
+    arg_parser.add_argument('--compare', help='json results of previous run')
+    options = arg_parser.parse_args()
+
+    temporary = None
+    if not options.database_uri:
+        temporary = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        options.database_uri = 'sqlite:///{}'.format(temporary.name)
+    # configuration is read at import time, all requests come from one client
+    os.environ['DATABASE_URI'] = options.database_uri
+    os.environ['RATE_LIMIT_ENABLED'] = '0'
+
+    from links import create_app, db, response_cache
+    from links.link.models import Category, Link
+
+    app = create_app()
+    if not options.cache:
+        response_cache.max_size = 0
+    previous = None
+    if options.compare:
+        with open(options.compare) as compare_file:
+            previous = json.load(compare_file)["results"]
+
+    results = {}
+    try:
+        with app.app_context():
+            db.create_all()
+            seed(db, Category, Link, options.categories, options.links)
+            counter = StatementCounter(db.engine)
+            for name, factory in endpoints(options):
+                if options.only and not any(part in name for part in options.only):
+                    continue
+                for concurrency in options.concurrency:
+                    results['{}@{}'.format(name, concurrency)] = run_endpoint(
+                        app, counter, factory, options.requests, concurrency)
+    finally:
+        if temporary is not None:
+            os.unlink(temporary.name)
+
+    print_results(results, previous)
+    if options.output:
+        with open(options.output, 'w') as output_file:
+            json.dump({
+                "options": {key: value for key, value in vars(options).items()
+                            if key not in ('output', 'compare')},
+                "results": results,
+            }, output_file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark of /links page latency in offset and cursor mode depending on page depth.
+
+Seeds configured database with links (if there are not enough of them yet) and
+measures latency of fetching page at growing depths.
+Offset latency grows with the depth, cursor latency should stay flat.
+
+Usage (from pylinks directory)::
+    python -m benchmarks.pagination --links 100000 --limit 100 --repeat 5
+"""
+
+import argparse
+import time
+
+from links import create_app, db, response_cache
+from links.link.models import Category, Link
+from lib.query import encode_cursor
+
+BENCH_CATEGORY = 'benchmark'
+
+
+def seed(count, batch=5000):
+    category = Category.query.filter_by(name=BENCH_CATEGORY).first()
+    if category is None:
+        db.session.execute(Category.__table__.insert(), [{"name": BENCH_CATEGORY}])
+        category = Category.query.filter_by(name=BENCH_CATEGORY).first()
+    existing = Link.query.count()
+    for start in range(existing, count, batch):
+        rows = [{
+            "name": "bench-{}".format(i),
+            "link": "http://bench.example.com/{}".format(i),
+            "category_id": category.id,
+        } for i in range(start, min(start + batch, count))]
+        db.session.execute(Link.__table__.insert(), rows)
+        db.session.commit()
+
+
+def measure(client, url, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url)
+        timings.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.data
+    return min(timings)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    arg_parser.add_argument('--links', type=int, default=100000)
+    arg_parser.add_argument('--limit', type=int, default=100)
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    arg_parser.add_argument('--depths', type=int, nargs='+', default=[0, 10, 100, 500, 900])
+    options = arg_parser.parse_args()
+
+    app = create_app()
+    # measure the database work, not the response cache
+    response_cache.max_size = 0
+    with app.app_context():
+        db.create_all()
+        seed(options.links)
+        client = app.test_client()
+        print('{:>8} {:>12} {:>12}'.format('page', 'offset [ms]', 'cursor [ms]'))
+        for depth in options.depths:
+            offset = depth * options.limit
+            if offset >= options.links:
+                continue
+            offset_url = '/api/v1/links?limit={}'.format(options.limit)
+            cursor_url = offset_url
+            if offset > 0:
+                offset_url += '&offset={}'.format(offset)
+                # id of the last row on the previous page, looked up outside of measurement
+                last_id = (Link.query.filter_by(active=None).order_by(Link.id)
+                           .offset(offset - 1).limit(1).first().id)
+                cursor_url += '&after={}'.format(encode_cursor([last_id]))
+            print('{:>8} {:>12.2f} {:>12.2f}'.format(
+                depth,
+                measure(client, offset_url, options.repeat) * 1000,
+                measure(client, cursor_url, options.repeat) * 1000))
+
+
+if __name__ == '__main__':
+    main()
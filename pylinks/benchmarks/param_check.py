@@ -0,0 +1,119 @@
+"""
+Micro-benchmark of request argument parsing overhead per request: views decorated by
+`use_args` of plain webargs `FlaskParser` with uncached url validation against views
+decorated by `lib.param_check.use_args` (LRU cached `is_url`, bulk links loaded one
+by one by `load_items` in the view, as in `links.link.resources`).
+
+Argument maps mirror the ones of `links.link.resources`, schemas are built once when
+the views are decorated, as for resources. Views run in a test request context,
+without routing or database. "cold" bulk clears the url cache before every
+parse (new urls), "repeated" re-submits the same payload.
+
+Usage (from pylinks directory)::
+    python -m benchmarks.param_check --repeat 2000 --bulk 1000
+"""
+
+import argparse
+import time
+
+
+def per_call(func, repeat):
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    arg_parser.add_argument('--repeat', type=int, default=2000)
+    arg_parser.add_argument('--bulk', type=int, default=1000, help='links in bulk payload')
+    options = arg_parser.parse_args()
+
+    from flask import Flask
+    from marshmallow import Schema, ValidationError
+    from marshmallow.validate import Length
+    from webargs import fields, flaskparser
+    from lib import param_check
+    from lib.param_check import between, gt, one_of, is_cursor, is_url, load_items
+
+    def uncached_is_url(url_string):
+        if not param_check._is_valid_url.__wrapped__(url_string):
+            raise ValidationError("Url address {} is not valid.".format(url_string))
+        return True
+
+    def link_args(url_validator):
+        return {
+            "name": fields.Str(required=True, validate=Length(min=1, max=50)),
+            "link": fields.Str(required=True, validate=url_validator),
+            "categoryId": fields.Int(required=True),
+        }
+
+    list_args = {
+        "limit": fields.Int(validate=between(1, 1000), missing=100),
+        "offset": fields.Int(missing=0, validate=gt(0)),
+        "after": fields.Str(validate=is_cursor),
+        "order": fields.Str(missing="id", validate=one_of(["id", "created"])),
+        "stream": fields.Bool(missing=False),
+        "alive": fields.Bool(),
+        "checkStatus": fields.Int(validate=between(100, 599)),
+    }
+    bulk_args = {"links": fields.List(fields.Nested(link_args(uncached_is_url)), required=True)}
+    item_bulk_args = {"links": fields.List(fields.Raw(), required=True)}
+    bulk_link_schema = Schema.from_dict(link_args(is_url))()
+
+    def view(args):
+        return args
+
+    def bulk_view(args):
+        return load_items(bulk_link_schema, args["links"])
+
+    def bulk_body(distinct_urls):
+        return {"links": [{
+            "name": "bulk {}".format(i),
+            "link": "https://bulk{}.example.com/page/{}".format(i % 97, i % distinct_urls),
+            "categoryId": 1,
+        } for i in range(options.bulk)]}
+
+    # name, path, json body, location, (baseline argmap, optimized argmap, optimized view),
+    # items, cold cache
+    cases = [
+        ("GET /links query", '/links?limit=100&order=created&alive=true', None, "query",
+         (list_args, list_args, view), None, False),
+        ("POST /links json", '/links', {
+            "name": "new link", "link": "https://example.com/path?a=1", "categoryId": 1},
+         "json", (link_args(uncached_is_url), link_args(is_url), view), None, False),
+        ("POST /links/bulk cold", '/links/bulk', bulk_body(options.bulk), "json",
+         (bulk_args, item_bulk_args, bulk_view), options.bulk, True),
+        ("POST /links/bulk repeated", '/links/bulk', bulk_body(options.bulk), "json",
+         (bulk_args, item_bulk_args, bulk_view), options.bulk, False),
+    ]
+
+    app = Flask(__name__)
+    plain_parser = flaskparser.FlaskParser()
+    print('{:<28} {:>14} {:>14} {:>9}'.format('case', 'webargs us', 'param_check us', 'speedup'))
+    for name, path, body, location, (baseline, optimized, optimized_func), items, cold in cases:
+        repeat = max(3, options.repeat * 10 // items) if items else options.repeat
+        with app.test_request_context(path, method='GET' if body is None else 'POST', json=body):
+            baseline_view = plain_parser.use_args(baseline, location=location)(view)
+            optimized_view = param_check.use_args(optimized, location=location)(optimized_func)
+
+            def parse_baseline():
+                baseline_view()
+
+            def parse_optimized():
+                if cold:
+                    param_check._is_valid_url.cache_clear()
+                optimized_view()
+
+            baseline_seconds = per_call(parse_baseline, repeat)
+            optimized_seconds = per_call(parse_optimized, repeat)
+        print('{:<28} {:>14.1f} {:>14.1f} {:>8.1f}x'.format(
+            name, baseline_seconds * 1e6, optimized_seconds * 1e6,
+            baseline_seconds / optimized_seconds))
+    print('is_url cache: {}'.format(param_check.is_url_cache_info()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""
+Query plan regression check of all endpoints of `links.link.resources`.
+
+Creates schema with migrations (temporary SQLite file unless --database-uri or
+DATABASE_URI is given), seeds it, calls every endpoint of `benchmarks.endpoints`
+and runs EXPLAIN on every SELECT it executes. Exits with status 1 when any query
+reads a whole table, except of tables listed in `ALLOWED_FULL_SCANS` for the endpoint.
+
+Every endpoint is called twice and only the second call is checked, process-local
+indexes (category tree, search index) are loaded by the first one with intended
+full reads.
+
+Usage (from pylinks directory)::
+    python -m benchmarks.query_plans --links 5000 --categories 200 -v
+"""
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+import threading
+
+# Endpoint name -> tables which the endpoint reads whole by design.
+ALLOWED_FULL_SCANS = {
+    "GET /links/export": {"link"},
+}
+
+SQLITE_FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+
+
+class StatementRecorder:
+    """
+    Records SELECT statements (with parameters) executed by current thread.
+    """
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self._local = threading.local()
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context,
+                               executemany):
+        statements = getattr(self._local, 'statements', None)
+        if statements is not None and not executemany and \
+                statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    def start(self):
+        self._local.statements = []
+
+    def stop(self):
+        statements, self._local.statements = self._local.statements, None
+        return statements
+
+
+def full_scans(connection, dialect, statement, parameters):
+    """
+    Names of tables read whole by `statement` and plan lines (for reporting).
+    """
+    cursor = connection.cursor()
+    try:
+        if dialect == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+            plan = [row[3] for row in cursor.fetchall()]
+            tables = {match.group(1) for match in map(SQLITE_FULL_SCAN.match, plan) if match}
+        else:
+            cursor.execute('EXPLAIN ' + statement, parameters)
+            columns = [column[0] for column in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            plan = ['{} type={} key={}'.format(row['table'], row['type'], row['key'])
+                    for row in rows]
+            tables = {row['table'] for row in rows if row['type'] == 'ALL'}
+    finally:
+        cursor.close()
+    return tables, plan
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    arg_parser.add_argument('--database-uri', default=os.environ.get('DATABASE_URI'))
+    arg_parser.add_argument('--links', type=int, default=5000)
+    arg_parser.add_argument('--categories', type=int, default=200)
+    arg_parser.add_argument('--limit', type=int, default=100, help='page size of list endpoints')
+    arg_parser.add_argument('-v', '--verbose', action='store_true', help='print all plans')
+    options = arg_parser.parse_args()
+    options.export = True
+
+    temporary = None
+    if not options.database_uri:
+        temporary = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        options.database_uri = 'sqlite:///{}'.format(temporary.name)
+    # configuration is read at import time
+    os.environ['DATABASE_URI'] = options.database_uri
+
+    from lib.migrate import Migrator
+    from links import create_app, db, response_cache
+    from links.link.models import Category, Link
+    from benchmarks.endpoints import seed, endpoints
+
+    app = create_app()
+    response_cache.max_size = 0
+
+    failures = []
+    try:
+        with app.app_context():
+            Migrator(db.engine, 'migrations').upgrade()
+            seed(db, Category, Link, options.categories, options.links)
+            dialect = db.engine.dialect.name
+            recorder = StatementRecorder(db.engine)
+            client = app.test_client()
+            raw_connection = db.engine.raw_connection()
+            try:
+                for name, factory in endpoints(options):
+                    for i in range(2):
+                        method, url, body = factory(i)
+                        recorder.start()
+                        client.open(url, method=method, json=body).get_data()
+                        statements = recorder.stop()
+                    allowed = ALLOWED_FULL_SCANS.get(name, set())
+                    checked = set()
+                    for statement, parameters in statements:
+                        if statement in checked:
+                            continue
+                        checked.add(statement)
+                        tables, plan = full_scans(raw_connection, dialect, statement, parameters)
+                        failed = tables - allowed
+                        if failed:
+                            failures.append(name)
+                        if failed or options.verbose:
+                            print('{} {}'.format('FULL SCAN' if failed else 'ok', name))
+                            print('    ' + ' '.join(statement.split()))
+                            for line in plan:
+                                print('    > ' + line)
+            finally:
+                raw_connection.close()
+    finally:
+        if temporary is not None:
+            os.unlink(temporary.name)
+
+    if failures:
+        print('Full table scans in: {}'.format(', '.join(sorted(set(failures)))))
+        sys.exit(1)
+    print('No full table scans.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Local check of read-replica routing (`lib.replica`) with SQLite stand-ins.
+
+Seeds primary SQLite file and copies it into `--replicas` replica files (copies are not
+replicated, which makes the replication lag visible), then checks that:
+
+* GET requests are spread over replicas and do not touch the primary,
+* writes go to the primary,
+* client which just wrote reads its own write (sticky to the primary),
+* request on a broken replica falls back to the primary and the replica is skipped.
+
+Exits with status 1 when any check fails.
+
+Usage (from pylinks directory)::
+    python -m benchmarks.replicas --replicas 2
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+
+class EngineCounter:
+    """
+    Counts statements executed by every engine.
+    """
+
+    def __init__(self, engines):
+        from sqlalchemy import event
+        self._lock = threading.Lock()
+        self.counts = {}
+        for name, engine in engines.items():
+            self.counts[name] = 0
+            event.listen(engine, 'before_cursor_execute', self._listener(name))
+
+    def _listener(self, name):
+        def before_cursor_execute(*args):
+            with self._lock:
+                self.counts[name] += 1
+        return before_cursor_execute
+
+    def reset(self):
+        with self._lock:
+            for name in self.counts:
+                self.counts[name] = 0
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    arg_parser.add_argument('--replicas', type=int, default=2)
+    arg_parser.add_argument('--links', type=int, default=1000)
+    arg_parser.add_argument('--categories', type=int, default=50)
+    arg_parser.add_argument('--requests', type=int, default=20)
+    options = arg_parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    primary = os.path.join(directory, 'primary.db')
+    replicas = [os.path.join(directory, 'replica{}.db'.format(i)) for i in range(options.replicas)]
+
+    # Seed the primary before the app is configured with replicas.
+    os.environ['DATABASE_URI'] = 'sqlite:///{}'.format(primary)
+    os.environ['DB_REPLICA_URIS'] = ','.join('sqlite:///{}'.format(path) for path in replicas)
+    os.environ['RESPONSE_CACHE_SIZE'] = '0'
+
+    from lib.migrate import Migrator
+    from links import create_app, db, read_replicas
+    from links.link.models import Category, Link
+    from benchmarks.endpoints import seed
+
+    app = create_app()
+    failures = []
+
+    def check(name, condition, detail=''):
+        print('{:<4} {} {}'.format('ok' if condition else 'FAIL', name, detail))
+        if not condition:
+            failures.append(name)
+
+    try:
+        with app.app_context():
+            Migrator(db.engine, 'migrations').upgrade()
+            seed(db, Category, Link, options.categories, options.links)
+            db.session.remove()
+            for path in replicas:
+                shutil.copyfile(primary, path)
+
+            counter = EngineCounter(db.engines)
+            client = app.test_client()
+
+            for i in range(options.requests):
+                client.get('/api/v1/links/{}'.format(i % options.links + 1)).get_data()
+            replica_counts = [counter.counts[key] for key in read_replicas.bind_keys]
+            check('reads go to replicas', counter.counts[None] == 0 and all(replica_counts),
+                  'primary={} replicas={}'.format(counter.counts[None], replica_counts))
+
+            counter.reset()
+            writer = app.test_client()
+            response = writer.post('/api/v1/links', json={
+                "name": "replica check", "link": "https://replica.example.com", "categoryId": 1})
+            new_id = response.get_json()["data"]["id"]
+            check('writes go to primary', response.status_code == 201 and
+                  sum(counter.counts[key] for key in read_replicas.bind_keys) == 0,
+                  'status={} counts={}'.format(response.status_code, counter.counts))
+
+            status = writer.get('/api/v1/links/{}'.format(new_id)).status_code
+            check('writer reads its write', status == 200, 'status={}'.format(status))
+            status = client.get('/api/v1/links/{}'.format(new_id)).status_code
+            check('other client reads replica', status == 404,
+                  'status={} (replica copies are not replicated)'.format(status))
+
+            broken = read_replicas.bind_keys[0]
+            os.unlink(replicas[0])
+            # requests share the session of the outer app context, release its connections
+            db.session.remove()
+            db.engines[broken].dispose()
+            statuses = [client.get('/api/v1/links/1').status_code
+                        for _ in range(len(read_replicas.bind_keys) * 2)]
+            replica_status = read_replicas.status()
+            check('broken replica falls back to primary', set(statuses) == {200} and
+                  replica_status["fallbacks"] == 1 and
+                  not replica_status["replicas"][0]["healthy"],
+                  'statuses={} fallbacks={}'.format(statuses, replica_status["fallbacks"]))
+    finally:
+        shutil.rmtree(directory)
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark of link search index against linear scan on synthetic dataset.
+
+Builds the index from generated (id, name, link) rows without touching the database
+and compares latency of indexed search with scanning all links for matching tokens.
+
+Usage (from pylinks directory)::
+    python -m benchmarks.search --links 1000000
+"""
+
+import argparse
+import random
+import time
+
+from links.link.search import LinkSearchIndex, tokenize
+
+WORDS = ('python', 'flask', 'rust', 'docs', 'guide', 'blog', 'news', 'video', 'music',
+         'recipe', 'travel', 'linux', 'kernel', 'database', 'mysql', 'index', 'search',
+         'cloud', 'storage', 'network', 'security', 'design', 'photo', 'game', 'book')
+HOSTS = ('example.com', 'docs.example.org', 'blog.example.net', 'wiki.example.io')
+QUERIES = ('python', 'pyth', 'flask docs', 'kernel', 'data', 'example', 'zzz', 'recipe book')
+
+
+def synthetic_rows(count, seed=0):
+    rnd = random.Random(seed)
+    for link_id in range(1, count + 1):
+        words = rnd.sample(WORDS, 3)
+        yield (link_id,
+               '{} {}'.format(' '.join(words), link_id),
+               'https://{}/{}/{}'.format(rnd.choice(HOSTS), '-'.join(words[:2]), link_id))
+
+
+def linear_scan(rows, query, limit):
+    query_tokens = tokenize(query)
+    result = []
+    for link_id, name, link in rows:
+        tokens = tokenize(name) + tokenize(link)
+        if all(any(token.startswith(query_token) for token in tokens)
+               for query_token in query_tokens):
+            result.append(link_id)
+            if len(result) == limit:
+                break
+    return result
+
+
+def timed(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    arg_parser.add_argument('--links', type=int, default=1000000)
+    arg_parser.add_argument('--limit', type=int, default=100)
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    options = arg_parser.parse_args()
+
+    rows = list(synthetic_rows(options.links))
+    index = LinkSearchIndex(model=None, ttl=0)
+    start = time.perf_counter()
+    index.load_rows(rows)
+    print('index built in {:.2f} s for {} links'.format(time.perf_counter() - start, len(rows)))
+
+    print('{:<16} {:>12} {:>12}'.format('query', 'index [ms]', 'scan [ms]'))
+    for query in QUERIES:
+        print('{:<16} {:>12.2f} {:>12.2f}'.format(
+            query,
+            timed(lambda: index.search(query, options.limit), options.repeat) * 1000,
+            timed(lambda: linear_scan(rows, query, options.limit), options.repeat) * 1000))
+
+
+if __name__ == '__main__':
+    main()
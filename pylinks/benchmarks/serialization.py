@@ -0,0 +1,87 @@
+"""
+Benchmark of link page serialization: ORM objects with `to_json` and flask `jsonify`
+against column rows with precompiled `link_row_serializer` and `lib.response.dumps`.
+
+Usage (from pylinks directory)::
+    python -m benchmarks.serialization --links 1000 --repeat 20
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+
+def timed(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    arg_parser.add_argument('--database-uri', default=os.environ.get('DATABASE_URI'))
+    arg_parser.add_argument('--links', type=int, default=1000, help='links on one page')
+    arg_parser.add_argument('--repeat', type=int, default=20)
+    options = arg_parser.parse_args()
+
+    temporary = None
+    if not options.database_uri:
+        temporary = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        options.database_uri = 'sqlite:///{}'.format(temporary.name)
+    # configuration is read at import time
+    os.environ['DATABASE_URI'] = options.database_uri
+
+    from flask import jsonify
+    from sqlalchemy.orm import joinedload
+    from links import create_app, db
+    from links.link.models import Category, Link, link_row_serializer, link_rows_query
+    from lib import response
+
+    def orm_page():
+        links = Link.query.options(joinedload(Link.category)).order_by(Link.id) \
+            .limit(options.links).all()
+        return jsonify([link.to_json() for link in links]).get_data()
+
+    def rows_page():
+        rows = link_rows_query().order_by(Link.id).limit(options.links).all()
+        return response.dumps([link_row_serializer(row) for row in rows])
+
+    def rows_page_stdlib():
+        rows = link_rows_query().order_by(Link.id).limit(options.links).all()
+        return response._json_dumps([link_row_serializer(row) for row in rows])
+
+    app = create_app(modules=[])
+    try:
+        with app.app_context():
+            db.create_all()
+            if Link.query.count() < options.links:
+                db.session.execute(Category.__table__.insert(), [{"name": "bench-serialize"}])
+                category = Category.query.filter_by(name="bench-serialize").first()
+                db.session.execute(Link.__table__.insert(), [{
+                    "name": "serialize {}".format(i),
+                    "link": "https://serialize.example.com/{}".format(i),
+                    "category_id": category.id,
+                } for i in range(options.links)])
+                db.session.commit()
+
+            variants = [
+                ('orm + to_json + jsonify', orm_page),
+                ('rows + serializer + stdlib json', rows_page_stdlib),
+            ]
+            if response.dumps is not response._json_dumps:
+                variants.append(('rows + serializer + orjson', rows_page))
+            print('{:<34} {:>10}'.format('variant ({} links)'.format(options.links), 'ms'))
+            for name, func in variants:
+                print('{:<34} {:>10.2f}'.format(name, timed(func, options.repeat) * 1000))
+    finally:
+        if temporary is not None:
+            os.unlink(temporary.name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Throughput comparison of the development runner (run.py, `app.run(debug=True)`)
+and the production server (gunicorn.conf.py).
+
+Seeds temporary SQLite file (unless --database-uri or DATABASE_URI is given), starts
+every server in a subprocess and drives it over HTTP from `--concurrency` client threads
+for `--duration` seconds, cycling through a mix of GET endpoints. Reports requests per
+second, p50/p99 latency and errors.
+
+Usage (from pylinks directory)::
+    python -m benchmarks.servers --workers 4 --threads 8 --concurrency 16 --duration 10
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.endpoints import percentile
+
+DEV_SERVER = "from wsgi import app; app.run(host='127.0.0.1', port={port}, debug=True, " \
+             "use_reloader=False)"
+
+
+def wait_until_up(url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Server exited with status {}.".format(process.returncode))
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    raise RuntimeError("Server did not start in {} seconds.".format(timeout))
+
+
+def drive(base_url, paths, concurrency, duration):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker(offset):
+        local_latencies = []
+        local_errors = 0
+        i = offset
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(base_url + paths[i % len(paths)], timeout=30) as response:
+                    response.read()
+            except (urllib.error.URLError, ConnectionError):
+                local_errors += 1
+            local_latencies.append(time.perf_counter() - start)
+            i += 1
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=worker, args=(i, )) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "throughput": round(len(latencies) / elapsed, 1),
+        "p50Ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99Ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    arg_parser.add_argument('--database-uri', default=os.environ.get('DATABASE_URI'))
+    arg_parser.add_argument('--links', type=int, default=10000)
+    arg_parser.add_argument('--categories', type=int, default=200)
+    arg_parser.add_argument('--workers', type=int, default=4)
+    arg_parser.add_argument('--threads', type=int, default=8)
+    arg_parser.add_argument('--concurrency', type=int, default=16)
+    arg_parser.add_argument('--duration', type=float, default=10)
+    arg_parser.add_argument('--port', type=int, default=18000)
+    options = arg_parser.parse_args()
+
+    directory = None
+    if not options.database_uri:
+        directory = tempfile.mkdtemp()
+        options.database_uri = 'sqlite:///{}'.format(os.path.join(directory, 'links.db'))
+    env = dict(os.environ, DATABASE_URI=options.database_uri, METRICS_ENABLED='0',
+               RATE_LIMIT_ENABLED='0', ADMISSION_STATE_PREFIX='pylinks-bench',
+               SERVER_WORKERS=str(options.workers), SERVER_THREADS=str(options.threads),
+               SERVER_BIND='127.0.0.1:{}'.format(options.port + 1))
+
+    seed_script = ("from links import create_app, db\n"
+                   "from links.link.models import Category, Link\n"
+                   "from benchmarks.endpoints import seed\n"
+                   "with create_app().app_context():\n"
+                   "    db.create_all(); seed(db, Category, Link, {}, {})").format(
+        options.categories, options.links)
+    subprocess.run([sys.executable, '-c', seed_script], env=env, check=True)
+
+    paths = ['/api/v1/links?limit=100', '/api/v1/categories?limit=100',
+             '/api/v1/links/search?q=bench1']
+    paths.extend('/api/v1/links/{}'.format(i * 97 % options.links + 1) for i in range(50))
+    paths.extend('/api/v1/categories/{}/path'.format(i % options.categories + 1)
+                 for i in range(10))
+
+    servers = [
+        ("run.py (dev server)", [sys.executable, '-c', DEV_SERVER.format(port=options.port)],
+         options.port),
+        ("gunicorn {}x{}".format(options.workers, options.threads),
+         [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+         options.port + 1),
+    ]
+    print('{:<24} {:>9} {:>9} {:>9} {:>8} {:>7}'.format(
+        'server', 'req/s', 'p50 ms', 'p99 ms', 'requests', 'errors'))
+    try:
+        for name, command, port in servers:
+            process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL,
+                                       stderr=subprocess.DEVNULL)
+            try:
+                base_url = 'http://127.0.0.1:{}'.format(port)
+                try:
+                    wait_until_up(base_url + paths[0], process)
+                except RuntimeError as err:
+                    print('{:<24} {}'.format(name, err))
+                    continue
+                drive(base_url, paths, options.concurrency, 1)
+                result = drive(base_url, paths, options.concurrency, options.duration)
+                print('{:<24} {:>9.1f} {:>9.2f} {:>9.2f} {:>8} {:>7}'.format(
+                    name, result["throughput"], result["p50Ms"], result["p99Ms"],
+                    result["requests"], result["errors"]))
+            finally:
+                process.terminate()
+                process.wait()
+    finally:
+        if directory is not None:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
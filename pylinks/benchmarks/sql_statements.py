@@ -0,0 +1,86 @@
+"""
+Check that number of SQL statements per request does not depend on page size.
+
+Every list and detail endpoint is requested with small and large page and the
+number of statements sent to the database is compared. Exits with non zero
+status when some endpoint issues more statements for larger page (N+1 queries).
+
+Usage (from pylinks directory)::
+    python -m benchmarks.sql_statements
+"""
+
+import sys
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from links import create_app, db, response_cache
+from links.link.models import Category, Link
+
+SMALL_PAGE = 2
+LARGE_PAGE = 50
+
+
+@contextmanager
+def count_statements(engine):
+    counter = [0]
+
+    def before_cursor_execute(*args):
+        counter[0] += 1
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def seed():
+    if Category.query.filter_by(name='sql-root').first() is None:
+        db.session.execute(Category.__table__.insert(), [{"name": "sql-root"}])
+        root = Category.query.filter_by(name='sql-root').first()
+        db.session.execute(Category.__table__.insert(), [
+            {"name": "sql-{}".format(i), "parent_id": root.id} for i in range(LARGE_PAGE)])
+        db.session.execute(Link.__table__.insert(), [{
+            "name": "sql-{}".format(i),
+            "link": "http://sql.example.com/{}".format(i),
+            "category_id": root.id + 1 + i,
+        } for i in range(LARGE_PAGE)])
+        db.session.commit()
+
+
+def statements_per_request(client, url):
+    # warm up process-local caches (category tree) first
+    client.get(url)
+    with count_statements(db.engine) as counter:
+        response = client.get(url)
+    assert response.status_code == 200, response.data
+    return counter[0]
+
+
+def main():
+    app = create_app()
+    # measure the database work, not the response cache
+    response_cache.max_size = 0
+    failed = False
+    with app.app_context():
+        db.create_all()
+        seed()
+        client = app.test_client()
+        for url in ('/api/v1/links?limit={}', '/api/v1/categories?limit={}'):
+            small = statements_per_request(client, url.format(SMALL_PAGE))
+            large = statements_per_request(client, url.format(LARGE_PAGE))
+            print('{:<32} {:>3} {:>3}'.format(url.format('N'), small, large))
+            failed = failed or small != large
+        link = Link.query.filter(Link.name.like('sql-%')).first()
+        category = Category.query.filter(Category.name.like('sql-%')).first()
+        for url in ('/api/v1/links/{}'.format(link.id),
+                    '/api/v1/categories/{}'.format(category.id)):
+            count = statements_per_request(client, url)
+            print('{:<32} {:>3}'.format(url, count))
+            failed = failed or count > 1
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
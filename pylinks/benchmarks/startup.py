@@ -0,0 +1,98 @@
+"""
+Cold start benchmark: interpreter start, `import links`, `create_app()` and first request.
+
+Every run is a fresh interpreter (in-memory SQLite database unless --database-uri
+or DATABASE_URI is given). Median of `--runs` runs is reported per phase. Exits with
+status 1 when median total cold start is over `--budget-ms`.
+
+Usage (from pylinks directory)::
+    python -m benchmarks.startup --runs 5 --budget-ms 1500 --importtime
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+CHILD = """
+import json, time
+start = time.perf_counter()
+from links import create_app, db
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+with app.app_context():
+    db.create_all()
+    response = app.test_client().get('/api/v1/links?limit=1')
+    assert response.status_code == 200, response.data
+requested = time.perf_counter()
+print(json.dumps({"import": imported - start, "createApp": created - imported,
+                  "firstRequest": requested - created}))
+"""
+
+PHASES = ('interpreter', 'import', 'createApp', 'firstRequest', 'total')
+
+
+def run_once(env):
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', CHILD], env=env, check=True,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout
+    total = time.perf_counter() - start
+    result = json.loads(output.decode().strip().splitlines()[-1])
+    result["total"] = total
+    result["interpreter"] = total - result["import"] - result["createApp"] - \
+        result["firstRequest"]
+    return result
+
+
+def print_importtime(env, top):
+    """
+    Modules with the largest cumulative import time (python -X importtime).
+    """
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import wsgi'], env=env,
+                            check=True, stdout=subprocess.DEVNULL,
+                            stderr=subprocess.PIPE).stderr.decode()
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_time, cumulative, name = line[len('import time:'):].split('|')
+        modules.append((int(cumulative), int(self_time), name.strip()))
+    modules.sort(reverse=True)
+    print('{:>10} {:>10}  module'.format('cumul ms', 'self ms'))
+    for cumulative, self_time, name in modules[:top]:
+        print('{:>10.1f} {:>10.1f}  {}'.format(cumulative / 1000, self_time / 1000, name))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    arg_parser.add_argument('--database-uri', default=os.environ.get('DATABASE_URI', 'sqlite://'))
+    arg_parser.add_argument('--runs', type=int, default=5)
+    arg_parser.add_argument('--budget-ms', type=float,
+                            default=float(os.environ.get('STARTUP_BUDGET_MS', 1500)))
+    arg_parser.add_argument('--importtime', action='store_true',
+                            help='print slowest imports of the application')
+    arg_parser.add_argument('--top', type=int, default=15)
+    options = arg_parser.parse_args()
+
+    env = dict(os.environ, DATABASE_URI=options.database_uri)
+    runs = [run_once(env) for _ in range(options.runs)]
+    medians = {phase: statistics.median(run[phase] for run in runs) * 1000 for phase in PHASES}
+    for phase in PHASES:
+        print('{:<14} {:>9.1f} ms'.format(phase, medians[phase]))
+    if options.importtime:
+        print_importtime(env, options.top)
+
+    if medians["total"] > options.budget_ms:
+        print('Cold start {:.1f} ms is over budget {:.1f} ms.'.format(
+            medians["total"], options.budget_ms))
+        sys.exit(1)
+    print('Cold start {:.1f} ms is within budget {:.1f} ms.'.format(
+        medians["total"], options.budget_ms))
+
+
+if __name__ == '__main__':
+    main()
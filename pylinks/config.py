@@ -7,3 +7,78 @@ class Config:
     DB_HOST = os.environ.get('DB_HOST', '0.0.0.0')
     DB_PORT = os.environ.get('DB_PORT', 3306)
     DATABASE = os.environ.get('DATABASE', 'links')
+    # Full sqlalchemy database uri (e.g. sqlite:///links.db for local runs),
+    # overrides DB_* settings above.
+    DATABASE_URI = os.environ.get('DATABASE_URI')
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    # Seconds after which connection is replaced, must be lower than MySQL wait_timeout.
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', '1').lower() in ('1', 'true', 'yes')
+    # Seconds to wait for free connection before request fails.
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 10))
+    # Seconds after which process-local category hierarchy is reloaded from the database.
+    CATEGORY_TREE_TTL = int(os.environ.get('CATEGORY_TREE_TTL', 60))
+    # Maximal number of cached GET responses (0 disables the cache) and their time to live.
+    RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 1000))
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 30))
+    # Seconds after which process-local link search index is reloaded from the database.
+    SEARCH_INDEX_TTL = int(os.environ.get('SEARCH_INDEX_TTL', 300))
+    # Link liveness checker (links.link.checker): number of concurrent probes, timeout
+    # of one probe, minimal seconds between requests to one host and links stored per batch.
+    LINK_CHECK_CONCURRENCY = int(os.environ.get('LINK_CHECK_CONCURRENCY', 16))
+    LINK_CHECK_TIMEOUT = float(os.environ.get('LINK_CHECK_TIMEOUT', 10))
+    LINK_CHECK_HOST_INTERVAL = float(os.environ.get('LINK_CHECK_HOST_INTERVAL', 1))
+    LINK_CHECK_BATCH_SIZE = int(os.environ.get('LINK_CHECK_BATCH_SIZE', 500))
+    # Per-request instrumentation (Server-Timing header and /metrics histograms).
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1').lower() in ('1', 'true', 'yes')
+    # Json encoder: "auto" (orjson if installed), "orjson" or "json".
+    JSON_BACKEND = os.environ.get('JSON_BACKEND', 'auto')
+    # Format of datetimes in responses: "http" (RFC 822) or "iso" (ISO 8601).
+    JSON_DATETIME_FORMAT = os.environ.get('JSON_DATETIME_FORMAT', 'http')
+    # Response compression negotiated by Accept-Encoding (brotli needs brotli package):
+    # minimal size of json body worth compressing, gzip level (1-9) and brotli quality
+    # (0-11). Streamed responses are always compressed.
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', '1').lower() in ('1', 'true', 'yes')
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+    COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+    COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))
+    # Number of distinct urls whose validation result (lib.param_check.is_url) is cached.
+    URL_VALIDATION_CACHE_SIZE = int(os.environ.get('URL_VALIDATION_CACHE_SIZE', 10000))
+    # Number of objects added in a unit of work after which pending changes are flushed.
+    UNIT_OF_WORK_FLUSH_SIZE = int(os.environ.get('UNIT_OF_WORK_FLUSH_SIZE', 1000))
+    # Comma separated sqlalchemy uris of read replicas serving GET requests (empty disables),
+    # seconds for which client's reads go to the primary after its write (should cover
+    # replication lag) and seconds for which failed replica is not used.
+    DB_REPLICA_URIS = os.environ.get('DB_REPLICA_URIS', '')
+    DB_REPLICA_STICKY_SECONDS = float(os.environ.get('DB_REPLICA_STICKY_SECONDS', 5))
+    DB_REPLICA_RETRY_INTERVAL = float(os.environ.get('DB_REPLICA_RETRY_INTERVAL', 30))
+    # Production server (gunicorn.conf.py): listen address, worker processes, threads per
+    # worker (keep it under DB_POOL_SIZE + DB_MAX_OVERFLOW), seconds given to workers to
+    # finish in-flight requests on reload / shutdown, request timeout and number of requests
+    # after which worker is replaced (0 disables).
+    SERVER_BIND = os.environ.get('SERVER_BIND', '0.0.0.0:8000')
+    SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS', (os.cpu_count() or 1) * 2 + 1))
+    SERVER_THREADS = int(os.environ.get('SERVER_THREADS', 8))
+    SERVER_GRACEFUL_TIMEOUT = int(os.environ.get('SERVER_GRACEFUL_TIMEOUT', 30))
+    SERVER_TIMEOUT = int(os.environ.get('SERVER_TIMEOUT', 60))
+    SERVER_MAX_REQUESTS = int(os.environ.get('SERVER_MAX_REQUESTS', 0))
+    # Number of trusted proxies in front of the application, their X-Forwarded-* headers
+    # give the client address and scheme (0 trusts none, use remote address of the socket).
+    PROXY_FIX_HOPS = int(os.environ.get('PROXY_FIX_HOPS', 0))
+    # Per-client token bucket rate limiting (clients are identified by API key header,
+    # by remote address without it, set PROXY_FIX_HOPS behind a proxy): tokens refilled
+    # per second, bucket size and number of bucket slots shared by worker processes of the host.
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '0').lower() in ('1', 'true', 'yes')
+    RATE_LIMIT_RATE = float(os.environ.get('RATE_LIMIT_RATE', 50))
+    RATE_LIMIT_BURST = float(os.environ.get('RATE_LIMIT_BURST', 100))
+    RATE_LIMIT_SLOTS = int(os.environ.get('RATE_LIMIT_SLOTS', 4096))
+    RATE_LIMIT_API_KEY_HEADER = os.environ.get('RATE_LIMIT_API_KEY_HEADER', 'X-Api-Key')
+    # Maximal number of expensive requests (lists, search, export, bulk) running at once
+    # on the host (0 disables), requests over it get 503 with Retry-After of given seconds.
+    CONCURRENCY_LIMIT = int(os.environ.get('CONCURRENCY_LIMIT', 16))
+    CONCURRENCY_RETRY_AFTER = int(os.environ.get('CONCURRENCY_RETRY_AFTER', 1))
+    # Directory (default /dev/shm) and file name prefix of admission control state shared
+    # by worker processes, use different prefixes for deployments sharing a host.
+    ADMISSION_STATE_DIR = os.environ.get('ADMISSION_STATE_DIR')
+    ADMISSION_STATE_PREFIX = os.environ.get('ADMISSION_STATE_PREFIX', 'pylinks')
@@ -0,0 +1,57 @@
+"""
+Gunicorn configuration of production server, settings are read from `Config.SERVER_*`.
+
+Usage (from pylinks directory)::
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The application is imported once in the master process (`preload_app`), process-local
+indexes are loaded there too and workers forked from it share them copy-on-write.
+Connection pools are never shared with workers, every worker opens its own connections.
+
+Signals of the master process:
+* HUP - graceful reload, new workers are started and old ones finish in-flight requests
+  (at most SERVER_GRACEFUL_TIMEOUT seconds). Application code is preloaded, so it is not
+  reloaded by HUP.
+* USR2, then QUIT to the old master - zero-downtime upgrade of application code, new master
+  is started on the same socket before the old one drains and exits.
+* TERM / QUIT - graceful shutdown, INT - fast shutdown.
+"""
+
+from config import Config
+
+bind = Config.SERVER_BIND
+workers = Config.SERVER_WORKERS
+threads = Config.SERVER_THREADS
+worker_class = 'gthread'
+preload_app = True
+graceful_timeout = Config.SERVER_GRACEFUL_TIMEOUT
+timeout = Config.SERVER_TIMEOUT
+max_requests = Config.SERVER_MAX_REQUESTS
+max_requests_jitter = Config.SERVER_MAX_REQUESTS // 10
+
+
+def when_ready(server):
+    from wsgi import app
+    from links import db
+    from links.link.models import category_tree, search_index
+
+    with app.app_context():
+        try:
+            category_tree.load()
+            search_index.load()
+        except Exception as err:
+            # Workers load indexes lazily themselves.
+            server.log.warning("Indexes were not preloaded: %s", err)
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def post_fork(server, worker):
+    from wsgi import app
+    from links import db
+
+    # Connections inherited from the master must not be used (nor closed) by workers.
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
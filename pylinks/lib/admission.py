@@ -0,0 +1,232 @@
+"""
+Lib for admission control: per-client rate limiting and concurrency limiting.
+
+* Every client (API key header, remote address without it, taken from X-Forwarded-For
+  of `PROXY_FIX_HOPS` trusted proxies) has a token bucket refilled with `rate` tokens
+  per second up to `burst`. Request without a token is rejected
+  with 429 and `Retry-After` (seconds until the next token).
+* Expensive endpoints (`Admission.limit_concurrency`) run at most `concurrency` at once.
+  Request over the limit is rejected immediately with 503 and `Retry-After` instead
+  of waiting for a database connection until the pool timeout.
+
+State is shared by all worker processes on the host through files in `state_dir`:
+buckets live in a memory mapped table guarded by `fcntl` lock, concurrency slots are
+`fcntl` byte-range locks, which the kernel releases when a worker dies.
+Clients hashed into the same bucket slot share the bucket when the table is full.
+
+Example usage::
+    admission = Admission()
+    admission.init_app(app)
+
+    class MyResource(Resource):
+        @admission.limit_concurrency
+        def get(self):
+            ...
+"""
+
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from functools import wraps
+
+from flask import request, make_response
+
+from lib.response import make_json_error_response
+
+# Bucket slot: client key hash, tokens, time of the last update (unix time).
+SLOT = struct.Struct('<Qdd')
+# Number of slots probed for client key before the least recently used one is reused.
+PROBES = 8
+
+
+def default_state_dir():
+    return '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+
+def _key_hash(key):
+    value = int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+    return value or 1
+
+
+class TokenBuckets:
+
+    def __init__(self, path, rate, burst, slots=4096):
+        self.path = path
+        self.rate = rate
+        self.burst = burst
+        self.slots = slots
+        self._lock = threading.Lock()
+        self._fd = None
+        self._map = None
+
+    def _open(self):
+        if self._map is None:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            size = SLOT.size * self.slots
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size)
+            self._fd = fd
+        return self._map
+
+    def _find(self, table, key):
+        start = key % self.slots
+        oldest = None
+        for probe in range(PROBES):
+            offset = (start + probe) % self.slots * SLOT.size
+            slot_key, _, updated = SLOT.unpack_from(table, offset)
+            if slot_key == key or slot_key == 0:
+                return offset, slot_key == key
+            if oldest is None or updated < oldest[1]:
+                oldest = (offset, updated)
+        return oldest[0], False
+
+    def acquire(self, client, cost=1.0):
+        """
+        Take `cost` tokens from bucket of `client`.
+        Returns 0 when taken, otherwise seconds until there are enough tokens.
+        """
+        key = _key_hash(client)
+        with self._lock:
+            table = self._open()
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                now = time.time()
+                offset, found = self._find(table, key)
+                if found:
+                    _, tokens, updated = SLOT.unpack_from(table, offset)
+                    tokens = min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+                else:
+                    tokens = self.burst
+                if tokens >= cost:
+                    tokens -= cost
+                    retry_after = 0
+                else:
+                    retry_after = (cost - tokens) / self.rate
+                SLOT.pack_into(table, offset, key, tokens, now)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+        return retry_after
+
+
+class ConcurrencySlots:
+
+    def __init__(self, path, limit):
+        self.path = path
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._fd = None
+        # Record locks are owned by the process, slots held by threads of this process
+        # must be tracked here (locking them again would succeed).
+        self._held = set()
+        self._next = 0
+
+    def acquire(self):
+        """
+        Index of acquired slot or None when all slots are taken.
+        """
+        with self._lock:
+            if self._fd is None:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            for i in range(self.limit):
+                slot = (self._next + i) % self.limit
+                if slot in self._held:
+                    continue
+                try:
+                    fcntl.lockf(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, slot)
+                except OSError:
+                    continue
+                self._held.add(slot)
+                self._next = slot + 1
+                return slot
+        return None
+
+    def release(self, slot):
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, slot)
+            self._held.discard(slot)
+
+
+def overloaded_response(status_code, message, retry_after):
+    response = make_json_error_response(status_code, [{"messages": [message]}])
+    response.headers['Retry-After'] = str(max(1, int(math.ceil(retry_after))))
+    return response
+
+
+class Admission:
+
+    def __init__(self):
+        self.buckets = None
+        self.concurrency = None
+        self.api_key_header = None
+        self.retry_after = 1
+        self.rejected = {429: 0, 503: 0}
+
+    def init_app(self, app):
+        config = app.config
+        state_dir = config.get('ADMISSION_STATE_DIR') or default_state_dir()
+        prefix = config.get('ADMISSION_STATE_PREFIX', 'pylinks')
+        self.api_key_header = config.get('RATE_LIMIT_API_KEY_HEADER', 'X-Api-Key')
+        self.retry_after = config.get('CONCURRENCY_RETRY_AFTER', 1)
+        if config.get('RATE_LIMIT_ENABLED'):
+            self.buckets = TokenBuckets(
+                os.path.join(state_dir, '{}-rate-limit.bin'.format(prefix)),
+                config['RATE_LIMIT_RATE'], config['RATE_LIMIT_BURST'],
+                config.get('RATE_LIMIT_SLOTS', 4096))
+            app.before_request(self._rate_limit)
+        if config.get('CONCURRENCY_LIMIT'):
+            self.concurrency = ConcurrencySlots(
+                os.path.join(state_dir, '{}-concurrency.lock'.format(prefix)),
+                config['CONCURRENCY_LIMIT'])
+
+    def client_id(self):
+        api_key = request.headers.get(self.api_key_header)
+        if api_key:
+            return 'key:' + api_key
+        return 'addr:{}'.format(request.remote_addr)
+
+    def _rate_limit(self):
+        retry_after = self.buckets.acquire(self.client_id())
+        if retry_after:
+            self.rejected[429] += 1
+            return overloaded_response(429, "Rate limit exceeded.", retry_after)
+
+    def limit_concurrency(self, func):
+        """
+        Decorator of expensive resource methods. Slot is held until streamed response ends.
+        """
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if self.concurrency is None:
+                return func(*args, **kwargs)
+            slot = self.concurrency.acquire()
+            if slot is None:
+                self.rejected[503] += 1
+                return overloaded_response(503, "Server is busy, try again later.",
+                                           self.retry_after)
+            try:
+                response = make_response(func(*args, **kwargs))
+            except BaseException:
+                self.concurrency.release(slot)
+                raise
+            if response.is_streamed:
+                response.call_on_close(lambda: self.concurrency.release(slot))
+            else:
+                self.concurrency.release(slot)
+            return response
+
+        return wrapper
+
+    def stats(self):
+        return {
+            "rateLimit": None if self.buckets is None else {
+                "rate": self.buckets.rate, "burst": self.buckets.burst},
+            "concurrencyLimit": None if self.concurrency is None else self.concurrency.limit,
+            "rejected": {str(status): count for status, count in self.rejected.items()},
+        }
@@ -0,0 +1,179 @@
+"""
+Lib for caching whole GET responses in memory.
+
+Cached responses are keyed by request path, query arguments and negotiated content
+encoding, bounded by number of entries (least recently used are evicted) and by time
+to live. Every response carries ETag, so clients sending `If-None-Match` get 304 without body.
+
+Resources tag responses with names of data they were built from (`add_cache_tags`),
+writes invalidate exactly the entries with given tags (`ResponseCache.invalidate`).
+Cache is process-local, other processes see writes after `ttl` seconds at the latest.
+
+Example usage::
+    class MyResource(Resource):
+        @response_cache.cached
+        def get(self, item_id):
+            add_cache_tags("item:{}".format(item_id))
+            ...
+
+    def save(self):
+        ...
+        response_cache.invalidate("item:{}".format(self.id))
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import g, request, make_response, Response
+
+from lib.compress import negotiate_encoding
+
+
+def add_cache_tags(*tags):
+    """
+    Tag response of current request, it is dropped from cache when any of `tags` is invalidated.
+    """
+    cache_tags = g.get('cache_tags')
+    if cache_tags is not None:
+        cache_tags.update(tags)
+
+
+def skip_cache():
+    """
+    Do not store response of current request in the cache.
+    """
+    g.cache_skip = True
+
+
+class CacheEntry:
+
+    __slots__ = ('body', 'status', 'headers', 'etag', 'tags', 'expires_at')
+
+    def __init__(self, body, status, headers, tags, expires_at):
+        self.body = body
+        self.status = status
+        self.headers = headers
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.tags = tags
+        self.expires_at = expires_at
+
+    def to_response(self):
+        response = Response(self.body, status=self.status, headers=self.headers)
+        response.set_etag(self.etag)
+        return response
+
+
+class ResponseCache:
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._tag_index = {}
+        # Incremented by every invalidation. Response computed while some invalidation
+        # happened may contain stale data, so it is not stored.
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_size = app.config.get('RESPONSE_CACHE_SIZE', self.max_size)
+        self.ttl = app.config.get('RESPONSE_CACHE_TTL', self.ttl)
+
+    @staticmethod
+    def make_key():
+        # Responses are compressed by encoding negotiated for the client, see `lib.compress`.
+        return request.path, tuple(sorted(request.args.items(multi=True))), negotiate_encoding()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at < time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, response, tags, version):
+        entry = CacheEntry(response.get_data(), response.status_code,
+                           [(name, value) for name, value in response.headers
+                            if name.lower() not in ('content-length', 'etag')],
+                           frozenset(tags), time.monotonic() + self.ttl)
+        with self._lock:
+            if version != self._version:
+                return entry
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            for tag in entry.tags:
+                self._tag_index.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+        return entry
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        for tag in entry.tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+
+    def invalidate(self, *tags):
+        """
+        Drop all entries tagged with any of `tags`.
+        """
+        with self._lock:
+            self._version += 1
+            for tag in tags:
+                for key in list(self._tag_index.get(tag, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+            self._tag_index.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "size": len(self._entries),
+                "maxSize": self.max_size,
+                "ttl": self.ttl,
+            }
+
+    def cached(self, func):
+        """
+        Decorator of resource GET methods. Only successful not streamed responses are cached.
+        """
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if self.max_size <= 0:
+                return func(*args, **kwargs)
+            key = self.make_key()
+            entry = self.get(key)
+            if entry is None:
+                version = self._version
+                g.cache_tags = set()
+                response = make_response(func(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed or g.get('cache_skip'):
+                    return response
+                entry = self.set(key, response, g.cache_tags, version)
+            return entry.to_response().make_conditional(request)
+
+        return wrapper
@@ -0,0 +1,105 @@
+"""
+Lib for change log of models, source of incremental sync feeds.
+
+Every flushed insert, update, soft delete (`active` set) or delete of a tracked model is
+recorded as a row of the change log table (id, entity, entity_id, action, created)
+in the same transaction. Rows are inserted right before the commit, after the
+transaction locks the single row of the lock table, which it holds until it commits or
+rolls back. Transactions writing the log therefore insert and commit one at a time and
+autoincrement ids follow commit order: a reader which saw id N+1 committed sees id N
+too, so a returned id is never followed by a smaller one committed later.
+
+Writes bypassing the ORM (executemany inserts) record their changes with `record`.
+
+Example usage::
+    change_log = ChangeLog(Change.__table__, ChangeLock.__table__, {Link: 'link'})
+    change_log.listen(db.session)
+    ...
+    changes, has_more = change_log.since(db.session, last_id, limit=100)
+"""
+
+from datetime import datetime
+
+from sqlalchemy import event, inspect, select
+
+CREATE = 'create'
+UPDATE = 'update'
+DELETE = 'delete'
+
+_INFO_KEY = 'change_log'
+
+
+class ChangeLog:
+
+    def __init__(self, table, lock_table, models, active_attribute='active'):
+        self.table = table
+        self.lock_table = lock_table
+        self.models = dict(models)
+        self.active_attribute = active_attribute
+
+    def listen(self, session):
+        event.listen(session, 'after_flush', self._after_flush)
+        event.listen(session, 'before_commit', self._before_commit)
+        event.listen(session, 'after_rollback', self._clear)
+
+    def record(self, session, entity, entity_ids, action):
+        """
+        Record `action` on `entity_ids` of `entity`, written with the running transaction.
+        """
+        session.info.setdefault(_INFO_KEY, []).extend(
+            (entity, entity_id, action) for entity_id in entity_ids)
+
+    def _action(self, obj):
+        added, _, deleted = inspect(obj).attrs[self.active_attribute].history
+        if added and added[0] is not None and deleted and deleted[0] is None:
+            return DELETE
+        return UPDATE
+
+    def _after_flush(self, session, flush_context):
+        # Session still holds pre-flush state (new / dirty / deleted and attribute history).
+        pending = session.info.setdefault(_INFO_KEY, [])
+        for obj in session.new:
+            entity = self.models.get(type(obj))
+            if entity is not None:
+                pending.append((entity, obj.id, CREATE))
+        for obj in session.dirty:
+            entity = self.models.get(type(obj))
+            if entity is not None and session.is_modified(obj, include_collections=False):
+                pending.append((entity, obj.id, self._action(obj)))
+        for obj in session.deleted:
+            entity = self.models.get(type(obj))
+            if entity is not None:
+                pending.append((entity, obj.id, DELETE))
+
+    def _lock(self, connection):
+        # Row lock of the update is held until the transaction ends.
+        lock = self.lock_table
+        result = connection.execute(lock.update().where(lock.c.id == 1)
+                                    .values(version=lock.c.version + 1))
+        if result.rowcount == 0:
+            # Schema created without migrations, the row is created by the first writer.
+            connection.execute(lock.insert().values(id=1, version=1))
+
+    def _before_commit(self, session):
+        session.flush()
+        pending = session.info.pop(_INFO_KEY, None)
+        if pending:
+            connection = session.connection()
+            self._lock(connection)
+            now = datetime.now()
+            connection.execute(self.table.insert(), [
+                {"entity": entity, "entity_id": entity_id, "action": action, "created": now}
+                for entity, entity_id, action in pending])
+
+    def _clear(self, session):
+        session.info.pop(_INFO_KEY, None)
+
+    def since(self, session, change_id, limit):
+        """
+        Up to `limit` changes with id greater than `change_id` in commit order
+        and whether there are more of them.
+        """
+        table = self.table
+        rows = session.execute(select(table).where(table.c.id > change_id)
+                               .order_by(table.c.id).limit(limit + 1)).all()
+        return rows[:limit], len(rows) > limit
@@ -0,0 +1,102 @@
+"""
+Lib for content-negotiated response compression.
+
+Encoding is chosen from request `Accept-Encoding`: brotli ("br", when the brotli
+package is installed) or gzip, none when the client accepts neither. Whole bodies are
+compressed by `compress`, streamed bodies chunk by chunk by `compress_chunks`, every
+chunk is flushed so the client can decode it as soon as it arrives.
+Settings are `Config.COMPRESSION_*`, replaced by config of the application by `init_app`.
+
+Example usage::
+    encoding = negotiate_encoding()
+    if encoding is not None:
+        response.set_data(compress(response.get_data(), encoding))
+        response.headers['Content-Encoding'] = encoding
+"""
+
+import gzip
+import zlib
+
+from flask import request, has_request_context
+
+from config import Config
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip', )
+
+_enabled = Config.COMPRESSION_ENABLED
+_gzip_level = Config.COMPRESSION_GZIP_LEVEL
+_brotli_quality = Config.COMPRESSION_BROTLI_QUALITY
+
+
+def init_app(app):
+    """
+    Compress responses by settings of `app` config (process wide).
+    """
+    global _enabled, _gzip_level, _brotli_quality
+    _enabled = app.config['COMPRESSION_ENABLED']
+    _gzip_level = app.config['COMPRESSION_GZIP_LEVEL']
+    _brotli_quality = app.config['COMPRESSION_BROTLI_QUALITY']
+
+
+def negotiate_encoding():
+    """
+    Best encoding accepted by the client of current request or None.
+    """
+    if not _enabled or not has_request_context():
+        return None
+    return request.accept_encodings.best_match(ENCODINGS)
+
+
+class _GzipCompressor:
+
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def process(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliCompressor:
+
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def process(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def compressor(encoding):
+    if encoding == 'br':
+        return _BrotliCompressor(_brotli_quality)
+    return _GzipCompressor(_gzip_level)
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=_brotli_quality)
+    # Constant mtime keeps the output (and the ETag of cached responses) stable.
+    return gzip.compress(data, _gzip_level, mtime=0)
+
+
+def compress_chunks(chunks, encoding):
+    """
+    Generator of compressed `chunks` (str or bytes), one output chunk per input chunk.
+    """
+    stream = compressor(encoding)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        if chunk:
+            yield stream.process(chunk)
+    yield stream.finish()
@@ -0,0 +1,86 @@
+"""
+Lib for turning database constraint violations into argument errors.
+
+Instead of checking uniqueness and existence of referenced rows with SELECTs before
+every write (extra round-trips, racy under concurrent writers) the write is attempted
+once and `IntegrityError` raised by unique / foreign key constraints is mapped back
+to the column which caused it.
+
+SQLite does not enforce foreign keys unless asked to, so they are switched on for
+every new SQLite connection.
+
+Example usage::
+    try:
+        link.save()
+    except IntegrityError as err:
+        db.session.rollback()
+        violation = constraint_violation(err, foreign_keys=["category_id"])
+        if violation is None:
+            raise
+        abort_argument_error(...)
+"""
+
+import re
+import sqlite3
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+UNIQUE = 'unique'
+FOREIGN_KEY = 'foreign_key'
+
+UNIQUE_PATTERNS = (
+    # sqlite: UNIQUE constraint failed: link.name
+    re.compile(r"UNIQUE constraint failed: (?:\w+\.)?(\w+)"),
+    # mysql: Duplicate entry 'x' for key 'name' (or 'link.name' since 8.0)
+    re.compile(r"Duplicate entry .* for key '(?:\w+\.)?(\w+)'"),
+    # postgresql: Key (name)=(x) already exists.
+    re.compile(r"Key \((\w+)\)=\(.*\) already exists"),
+)
+
+FOREIGN_KEY_PATTERNS = (
+    # mysql: ... CONSTRAINT `link_ibfk_1` FOREIGN KEY (`category_id`) REFERENCES ...
+    re.compile(r"FOREIGN KEY \(`?(\w+)`?\)"),
+    # postgresql: Key (category_id)=(5) is not present in table "category".
+    re.compile(r"Key \((\w+)\)=\(.*\) is not present"),
+)
+
+
+@event.listens_for(Engine, 'connect')
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
+
+class ConstraintViolation:
+
+    __slots__ = ('kind', 'column')
+
+    def __init__(self, kind, column):
+        self.kind = kind
+        self.column = column
+
+    def __repr__(self):
+        return '<ConstraintViolation kind=%s column=%s>' % (self.kind, self.column)
+
+
+def constraint_violation(err, foreign_keys=()):
+    """
+    ConstraintViolation of `err` (IntegrityError) or None when it is not recognised.
+    SQLite does not tell which foreign key failed, it is reported as the first
+    of `foreign_keys` (foreign key columns of the written table).
+    """
+    message = str(err.orig)
+    for pattern in UNIQUE_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return ConstraintViolation(UNIQUE, match.group(1))
+    for pattern in FOREIGN_KEY_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return ConstraintViolation(FOREIGN_KEY, match.group(1))
+    if 'FOREIGN KEY constraint failed' in message and foreign_keys:
+        return ConstraintViolation(FOREIGN_KEY, foreign_keys[0])
+    return None
@@ -0,0 +1,193 @@
+"""
+Lib for per-request performance instrumentation.
+
+For every request it records number and time of SQL statements, time of argument
+parsing, serialization and response rendering and total handler time. Timings are
+sent back in `Server-Timing` header and aggregated into per-endpoint histograms
+which are exported in Prometheus text format by `RequestMetrics.render`.
+
+Histograms are process-local, every worker process exports its own.
+
+Example usage::
+    metrics = RequestMetrics()
+    metrics.init_app(app)
+
+    with timed("serialize"):
+        result = [item.to_json() for item in items]
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# Order of phases in Server-Timing header.
+PHASES = ('parse', 'sql', 'serialize', 'render')
+
+
+def _request_timings():
+    if not has_request_context():
+        return None
+    return g.get('timings')
+
+
+def record_timing(phase, duration):
+    """
+    Add `duration` (seconds) to `phase` of current request, no-op outside of request.
+    """
+    timings = _request_timings()
+    if timings is not None:
+        timings[phase] = timings.get(phase, 0.0) + duration
+
+
+@contextmanager
+def timed(phase):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(phase, time.perf_counter() - start)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info['query_start'].pop()
+    timings = _request_timings()
+    if timings is not None:
+        timings['sql'] = timings.get('sql', 0.0) + duration
+        timings['sql_count'] = timings.get('sql_count', 0) + 1
+
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('query_start'):
+        connection.info['query_start'].pop()
+
+
+class Histogram:
+
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.total += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            cumulative += bucket_count
+            lines.append('{}_bucket{{{},le="{}"}} {}'.format(name, labels, bound, cumulative))
+        lines.append('{}_bucket{{{},le="+Inf"}} {}'.format(name, labels, self.count))
+        lines.append('{}_sum{{{}}} {}'.format(name, labels, self.total))
+        lines.append('{}_count{{{}}} {}'.format(name, labels, self.count))
+        return lines
+
+
+class EndpointMetrics:
+
+    __slots__ = ('duration', 'sql_duration', 'sql_count', 'phases', 'statuses')
+
+    def __init__(self):
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.sql_duration = Histogram(DURATION_BUCKETS)
+        self.sql_count = Histogram(SQL_COUNT_BUCKETS)
+        self.phases = {}
+        self.statuses = {}
+
+
+class RequestMetrics:
+
+    def __init__(self, prefix='pylinks'):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def init_app(self, app):
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    @staticmethod
+    def _before_request():
+        g.timings = {}
+        g.request_start = time.perf_counter()
+
+    def _after_request(self, response):
+        timings = g.get('timings')
+        if timings is None:
+            return response
+        total = time.perf_counter() - g.request_start
+        header = []
+        for phase in PHASES:
+            if phase in timings:
+                entry = '{};dur={:.2f}'.format(phase, timings[phase] * 1000)
+                if phase == 'sql':
+                    entry += ';desc="statements={}"'.format(timings['sql_count'])
+                header.append(entry)
+        header.append('total;dur={:.2f}'.format(total * 1000))
+        response.headers.add('Server-Timing', ', '.join(header))
+
+        rule = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        key = (request.method, rule)
+        with self._lock:
+            metrics = self._endpoints.get(key)
+            if metrics is None:
+                metrics = self._endpoints[key] = EndpointMetrics()
+            metrics.duration.observe(total)
+            metrics.sql_duration.observe(timings.get('sql', 0.0))
+            metrics.sql_count.observe(timings.get('sql_count', 0))
+            for phase in PHASES:
+                if phase != 'sql' and phase in timings:
+                    metrics.phases[phase] = metrics.phases.get(phase, 0.0) + timings[phase]
+            metrics.statuses[response.status_code] = \
+                metrics.statuses.get(response.status_code, 0) + 1
+        return response
+
+    def render(self):
+        """
+        All collected metrics in Prometheus text exposition format.
+        """
+        prefix = self.prefix
+        with self._lock:
+            endpoints = [('method="{}",endpoint="{}"'.format(method, rule), metrics)
+                         for (method, rule), metrics in sorted(self._endpoints.items())]
+            lines = ['# TYPE {}_requests_total counter'.format(prefix)]
+            for labels, metrics in endpoints:
+                for status, status_count in sorted(metrics.statuses.items()):
+                    lines.append('{}_requests_total{{{},status="{}"}} {}'.format(
+                        prefix, labels, status, status_count))
+            for name, attribute in (('request_duration_seconds', 'duration'),
+                                    ('request_sql_duration_seconds', 'sql_duration'),
+                                    ('request_sql_statements', 'sql_count')):
+                lines.append('# TYPE {}_{} histogram'.format(prefix, name))
+                for labels, metrics in endpoints:
+                    lines.extend(getattr(metrics, attribute).render(
+                        '{}_{}'.format(prefix, name), labels))
+            lines.append('# TYPE {}_request_phase_seconds_total counter'.format(prefix))
+            for labels, metrics in endpoints:
+                for phase, phase_total in sorted(metrics.phases.items()):
+                    lines.append('{}_request_phase_seconds_total{{{},phase="{}"}} {}'.format(
+                        prefix, labels, phase, phase_total))
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,137 @@
+"""
+Lib for versioned schema migrations.
+
+Migrations are modules of one package named `<version>_<name>.py` (e.g.
+`0002_list_indexes.py`), applied in order of their versions. Every module defines
+`upgrade(connection)` and optionally `downgrade(connection)`, its docstring is used
+as description. Applied versions are recorded in `schema_migration` table, every
+migration runs in its own transaction.
+
+Migrations must be idempotent where the database cannot roll DDL back (MySQL),
+`create_index` / `drop_index` helpers skip indexes which already exist / are missing.
+
+Example usage::
+    migrator = Migrator(db.engine, 'migrations')
+    for migration in migrator.upgrade():
+        print('applied', migration.version)
+"""
+
+import importlib
+import pkgutil
+from datetime import datetime
+
+from sqlalchemy import Table, Column, MetaData, String, DateTime, inspect, select
+
+metadata = MetaData()
+
+schema_migration = Table(
+    'schema_migration', metadata,
+    Column('version', String(20), primary_key=True),
+    Column('applied', DateTime, nullable=False),
+)
+
+
+class Migration:
+
+    __slots__ = ('version', 'name', 'module')
+
+    def __init__(self, version, name, module):
+        self.version = version
+        self.name = name
+        self.module = module
+
+    @property
+    def description(self):
+        return (self.module.__doc__ or '').strip().split('\n')[0]
+
+    def __repr__(self):
+        return '<Migration version=%s name=%r>' % (self.version, self.name)
+
+
+class Migrator:
+
+    def __init__(self, engine, package):
+        self.engine = engine
+        self.package = package
+
+    def migrations(self):
+        """
+        All migrations of the package sorted by version.
+        """
+        package = importlib.import_module(self.package)
+        result = []
+        for module_info in pkgutil.iter_modules(package.__path__):
+            version, _, name = module_info.name.partition('_')
+            if not version.isdigit():
+                continue
+            module = importlib.import_module('{}.{}'.format(self.package, module_info.name))
+            result.append(Migration(version, name, module))
+        result.sort(key=lambda migration: int(migration.version))
+        return result
+
+    def applied(self):
+        """
+        Set of versions applied to the database.
+        """
+        with self.engine.begin() as connection:
+            metadata.create_all(connection)
+            return {row[0] for row in connection.execute(select(schema_migration.c.version))}
+
+    def pending(self):
+        applied = self.applied()
+        return [migration for migration in self.migrations()
+                if migration.version not in applied]
+
+    def upgrade(self, target=None):
+        """
+        Apply pending migrations up to `target` version (all if None).
+        Returns list of applied migrations.
+        """
+        done = []
+        for migration in self.pending():
+            if target is not None and int(migration.version) > int(target):
+                break
+            with self.engine.begin() as connection:
+                migration.module.upgrade(connection)
+                connection.execute(schema_migration.insert().values(
+                    version=migration.version, applied=datetime.now()))
+            done.append(migration)
+        return done
+
+    def downgrade(self, target):
+        """
+        Revert applied migrations newer than `target` version, newest first.
+        Nothing is reverted when any of them can not be reverted.
+        Returns list of reverted migrations.
+        """
+        applied = self.applied()
+        pending = [migration for migration in reversed(self.migrations())
+                   if migration.version in applied and int(migration.version) > int(target)]
+        for migration in pending:
+            if not hasattr(migration.module, 'downgrade'):
+                raise ValueError("Migration {} can not be reverted.".format(migration.version))
+        done = []
+        for migration in pending:
+            with self.engine.begin() as connection:
+                migration.module.downgrade(connection)
+                connection.execute(schema_migration.delete().where(
+                    schema_migration.c.version == migration.version))
+            done.append(migration)
+        return done
+
+
+def _index_names(connection, table_name):
+    return {index['name'] for index in inspect(connection).get_indexes(table_name)}
+
+
+def create_index(connection, index):
+    """
+    Create `index` (sqlalchemy Index bound to a table) unless it already exists.
+    """
+    if index.name not in _index_names(connection, index.table.name):
+        index.create(connection)
+
+
+def drop_index(connection, index):
+    if index.name in _index_names(connection, index.table.name):
+        index.drop(connection)
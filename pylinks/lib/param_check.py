@@ -25,12 +25,27 @@ Example usage::
 
 """
 
+from functools import lru_cache
+
 from webargs import flaskparser, ValidationError
 from marshmallow import validate
-import validators
-from validators import ValidationFailure
 
-parser = flaskparser.FlaskParser()
+from config import Config
+from lib.query import decode_cursor
+from lib.metrics import timed
+
+
+class TimedFlaskParser(flaskparser.FlaskParser):
+    """
+    FlaskParser recording time spent by parsing into request metrics.
+    """
+
+    def parse(self, *args, **kwargs):
+        with timed("parse"):
+            return super().parse(*args, **kwargs)
+
+
+parser = TimedFlaskParser()
 
 
 @parser.error_handler
@@ -66,6 +81,17 @@ def handle_error(err, req, schema, *, error_status_code, error_headers):
     flaskparser.abort(400, errors=errors, status=400)
 
 
+def abort_argument_error(argument_name, message):
+    """
+    Abort request with 400 in the same format as errors raised by argument parsing.
+    Use it for argument errors which are detected only in the resource itself.
+    """
+    flaskparser.abort(400, errors=[{
+        "argumentName": argument_name,
+        "messages": [message]
+    }], status=400)
+
+
 use_args = parser.use_args
 use_kwargs = parser.use_kwargs
 
@@ -217,12 +243,67 @@ def not_both_args(arg1, arg2):
     return not_both_args_impl
 
 
-def is_url(url_string):
+def _check_url(url_string):
+    # validators imports pkg_resources, which is slow, import it on first use
+    import validators
+    from validators import ValidationFailure
+
     result = validators.url(url_string)
+    return bool(result) and not isinstance(result, ValidationFailure)
 
-    err_message = "Url address {} is not valid.".format(url_string)
-    if isinstance(result, ValidationFailure):
-        raise ValidationError(err_message)
-    if not result:
-        raise ValidationError(err_message)
-    return result
+
+_is_valid_url = lru_cache(maxsize=Config.URL_VALIDATION_CACHE_SIZE)(_check_url)
+
+
+def init_app(app):
+    """
+    Cache url validation results by size of `app` config (process wide).
+    """
+    global _is_valid_url
+    size = app.config['URL_VALIDATION_CACHE_SIZE']
+    if size != _is_valid_url.cache_info().maxsize:
+        _is_valid_url = lru_cache(maxsize=size)(_check_url)
+
+
+def is_url(url_string):
+    """
+    checks if url is valid, results of recently checked urls are cached
+    """
+    if not _is_valid_url(url_string):
+        raise ValidationError("Url address {} is not valid.".format(url_string))
+    return True
+
+
+def is_url_cache_info():
+    return _is_valid_url.cache_info()
+
+
+def load_items(schema, items):
+    """
+    Load every item of `items` (e.g. bulk payload) by `schema` instance on its own, so
+    invalid items do not fail the others. Returns tuple (list of loaded items with None
+    for invalid ones, list of errors of every item in the format of argument errors).
+    """
+    loaded = []
+    errors = []
+    for item in items:
+        try:
+            loaded.append(schema.load(item))
+            errors.append([])
+        except ValidationError as err:
+            messages = err.messages if isinstance(err.messages, dict) else {"_schema": err.messages}
+            loaded.append(None)
+            errors.append([{"argumentName": key, "messages": value}
+                           for key, value in messages.items()])
+    return loaded, errors
+
+
+def is_cursor(cursor):
+    """
+    checks if cursor is in valid form
+    """
+    try:
+        decode_cursor(cursor)
+    except ValueError as err:
+        raise ValidationError(str(err))
+    return True
@@ -0,0 +1,96 @@
+"""
+Lib for sqlalchemy connection pool configuration and statistics.
+"""
+
+import threading
+import time
+
+from sqlalchemy.pool import QueuePool
+
+
+class PoolWaitStats:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+
+    def record(self, wait, timed_out=False):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += wait
+            if wait > self.wait_max:
+                self.wait_max = wait
+            if timed_out:
+                self.timeouts += 1
+
+    def to_json(self):
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "waitTotalMs": round(self.wait_total * 1000, 3),
+                "waitAvgMs": round(self.wait_total * 1000 / self.checkouts, 3)
+                if self.checkouts else 0.0,
+                "waitMaxMs": round(self.wait_max * 1000, 3),
+            }
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool measuring how long checkouts wait for free connection.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = True
+        try:
+            connection = super()._do_get()
+            timed_out = False
+            return connection
+        finally:
+            self.wait_stats.record(time.perf_counter() - start, timed_out)
+
+
+def engine_options(uri, pool_size, max_overflow, pool_recycle, pool_pre_ping, pool_timeout):
+    """
+    Engine options for `uri`. SQLite (local runs) keeps its default pool,
+    other databases get `TimedQueuePool` with given limits.
+    """
+    if uri.startswith('sqlite'):
+        return {}
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_recycle": pool_recycle,
+        "pool_pre_ping": pool_pre_ping,
+        "pool_timeout": pool_timeout,
+    }
+
+
+def pool_status(engine):
+    """
+    Live statistics of `engine` connection pool.
+    """
+    pool = engine.pool
+    result = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        result.update({
+            "size": pool.size(),
+            "checkedIn": pool.checkedin(),
+            "checkedOut": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "maxOverflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+        })
+    wait_stats = getattr(pool, 'wait_stats', None)
+    if wait_stats is not None:
+        result["wait"] = wait_stats.to_json()
+    return result
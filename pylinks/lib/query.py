@@ -1,3 +1,22 @@
+"""
+Lib for paging through sqlalchemy queries.
+
+Two modes are supported:
+
+* offset paging (``apply_limit_and_offset``) - simple, but the database has to
+  scan and throw away every skipped row, so deep pages get slower and slower.
+* keyset (cursor) paging (``apply_keyset``) - rows are ordered by a unique key and
+  the next page starts right after the last seen key, so every page costs the same.
+
+Cursors are opaque for clients, they are urlsafe base64 encoded json lists of key values.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_, DateTime
 
 
 def apply_limit_and_offset(query, limit, offset):
@@ -5,3 +24,96 @@ def apply_limit_and_offset(query, limit, offset):
     if offset > 0:
         query = query.offset(offset)
     return query
+
+
+def encode_cursor(values):
+    """
+    Encode list of key `values` into opaque cursor string.
+    """
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """
+    Decode opaque `cursor` string into list of key values.
+    Raises ValueError when cursor is malformed.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError("Malformed cursor {}.".format(cursor))
+    if not isinstance(values, list) or not values:
+        raise ValueError("Malformed cursor {}.".format(cursor))
+    return values
+
+
+def _coerce_key_value(column, value):
+    """
+    Cursor `value` converted to type of key `column` (datetimes are iso formatted strings).
+    Raises ValueError when the value does not have type of the column.
+    """
+    if isinstance(column.type, DateTime):
+        try:
+            return datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise ValueError("Cursor value {!r} of {} is not a datetime.".format(value, column.key))
+    python_type = column.type.python_type
+    if isinstance(value, bool) or not isinstance(value, python_type):
+        raise ValueError("Cursor value {!r} of {} is not {}.".format(
+            value, column.key, python_type.__name__))
+    return value
+
+
+def _keyset_condition(columns, values):
+    # (c1, c2) > (v1, v2) expanded into c1 > v1 OR (c1 = v1 AND c2 > v2),
+    # row value comparison is not used because MySQL does not always use indexes for it.
+    conditions = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        equal_prefix = [columns[j] == values[j] for j in range(i)]
+        conditions.append(and_(*equal_prefix, column > value))
+    return or_(*conditions)
+
+
+def apply_keyset(query, columns, after, limit):
+    """
+    Order `query` by `columns` and return at most `limit` rows following cursor `after`.
+    Last of `columns` must be unique (usually primary key) to make the order total.
+    """
+    query = query.order_by(*columns)
+    if after is not None:
+        values = decode_cursor(after)
+        if len(values) != len(columns):
+            raise ValueError("Cursor {} does not match requested order.".format(after))
+        values = [_coerce_key_value(column, value) for column, value in zip(columns, values)]
+        query = query.filter(_keyset_condition(columns, values))
+    return query.limit(limit)
+
+
+def page_query(query, columns, limit, offset=0, after=None):
+    """
+    Restrict `query` ordered by `columns` to one page.
+    If cursor `after` is given keyset paging is used, otherwise `offset` is applied.
+    """
+    if after is not None:
+        return apply_keyset(query, columns, after, limit)
+    return apply_limit_and_offset(query.order_by(*columns), limit, offset)
+
+
+def paginate(query, columns, limit, offset=0, after=None, key_values=None):
+    """
+    Page through `query` ordered by `columns`, see `page_query`.
+    `key_values(item, columns)` returns values of `columns` of an item, by default
+    they are read as attributes (for ORM objects).
+    Returns tuple (items, next_cursor), next_cursor is None on the last page.
+    """
+    items = page_query(query, columns, limit, offset=offset, after=after).all()
+    next_cursor = None
+    if len(items) == limit:
+        if key_values is None:
+            values = [getattr(items[-1], column.key) for column in columns]
+        else:
+            values = key_values(items[-1], columns)
+        next_cursor = encode_cursor(values)
+    return items, next_cursor
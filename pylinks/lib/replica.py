@@ -0,0 +1,171 @@
+"""
+Lib for routing reads of GET requests to read replicas.
+
+Replica engines are Flask-SQLAlchemy binds (`SQLALCHEMY_BINDS`). For every GET / HEAD
+request `ReplicaSet` picks one healthy replica (round robin) and `RoutingSession` sends
+all SELECTs of the request to it. Everything else (writes, flushes, other requests)
+goes to the primary.
+
+Read-your-writes: successful write requests set `read_primary_until` cookie, GETs of
+that client are served by the primary until it expires (`sticky_seconds`, chosen to
+cover replication lag). Responses read from a replica within `sticky_seconds` after
+a write done by this process are not stored in the response cache, they may miss it.
+
+Health: request which fails on a replica with `OperationalError` is retried once
+on the primary (`ReplicaSet.fallback` decorator of resource views) and the replica is
+skipped for `retry_interval` seconds, then it is probed with `SELECT 1` before use.
+
+Example usage::
+    app.config["SQLALCHEMY_BINDS"] = {"replica0": uri0, "replica1": uri1}
+    db = SQLAlchemy(app, session_options={"class_": RoutingSession})
+    replicas = ReplicaSet([], sticky_seconds=5, retry_interval=30)
+    replicas.init_app(app, db)
+    api = Api(blueprint, decorators=[replicas.fallback])
+"""
+
+import threading
+import time
+from functools import wraps
+
+from flask import g, request, has_request_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from lib.cache import skip_cache
+
+STICKY_COOKIE = 'read_primary_until'
+READ_METHODS = ('GET', 'HEAD')
+
+
+class RoutingSession(Session):
+    """
+    Session sending SELECTs to replica bind chosen for current request (`g.read_bind`).
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and getattr(clause, 'is_select', False) \
+                and has_request_context():
+            bind_key = g.get('read_bind')
+            if bind_key is not None:
+                return self._db.engines[bind_key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaSet:
+
+    def __init__(self, bind_keys, sticky_seconds, retry_interval):
+        self.bind_keys = list(bind_keys)
+        self.sticky_seconds = sticky_seconds
+        self.retry_interval = retry_interval
+        self.db = None
+        self._lock = threading.Lock()
+        self._next = 0
+        self._failed = {}
+        self._last_write = None
+        self.reads = {bind_key: 0 for bind_key in self.bind_keys}
+        self.fallbacks = 0
+
+    def init_app(self, app, db):
+        """
+        Use all binds of `app` as replicas.
+        """
+        self.db = db
+        self.bind_keys = list(app.config.get('SQLALCHEMY_BINDS') or ())
+        self.reads = {bind_key: 0 for bind_key in self.bind_keys}
+        self.sticky_seconds = app.config.get('DB_REPLICA_STICKY_SECONDS', self.sticky_seconds)
+        self.retry_interval = app.config.get('DB_REPLICA_RETRY_INTERVAL', self.retry_interval)
+        if self.bind_keys:
+            app.before_request(self._before_request)
+            app.after_request(self._after_request)
+
+    def _before_request(self):
+        g.read_bind = None
+        if request.method not in READ_METHODS:
+            return
+        try:
+            primary_until = float(request.cookies.get(STICKY_COOKIE, 0))
+        except ValueError:
+            primary_until = 0
+        if primary_until > time.time():
+            return
+        g.read_bind = self.choose()
+        last_write = self._last_write
+        if g.read_bind is not None and last_write is not None and \
+                time.monotonic() - last_write < self.sticky_seconds:
+            skip_cache()
+
+    def _after_request(self, response):
+        if request.method not in READ_METHODS and response.status_code < 400:
+            self._last_write = time.monotonic()
+            response.set_cookie(STICKY_COOKIE, str(time.time() + self.sticky_seconds),
+                                max_age=int(self.sticky_seconds) + 1, httponly=True)
+        return response
+
+    def choose(self):
+        """
+        Bind key of next healthy replica, None when there is none (read from the primary).
+        """
+        for _ in range(len(self.bind_keys)):
+            with self._lock:
+                bind_key = self.bind_keys[self._next % len(self.bind_keys)]
+                self._next += 1
+                failed_at = self._failed.get(bind_key)
+            if failed_at is not None:
+                if time.monotonic() - failed_at < self.retry_interval or not self._probe(bind_key):
+                    continue
+            with self._lock:
+                self.reads[bind_key] += 1
+            return bind_key
+        return None
+
+    def _probe(self, bind_key):
+        try:
+            with self.db.engines[bind_key].connect() as connection:
+                connection.execute(text('SELECT 1'))
+        except OperationalError:
+            self.mark_failed(bind_key)
+            return False
+        with self._lock:
+            self._failed.pop(bind_key, None)
+        return True
+
+    def mark_failed(self, bind_key):
+        with self._lock:
+            self._failed[bind_key] = time.monotonic()
+
+    def fallback(self, view):
+        """
+        Decorator of views retrying request on the primary when its replica fails.
+        """
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                return view(*args, **kwargs)
+            except OperationalError:
+                bind_key = g.get('read_bind')
+                if bind_key is None:
+                    raise
+                self.mark_failed(bind_key)
+                self.db.session.rollback()
+                g.read_bind = None
+                with self._lock:
+                    self.fallbacks += 1
+                return view(*args, **kwargs)
+
+        return wrapper
+
+    def status(self):
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "replicas": [{
+                    "bind": bind_key,
+                    "healthy": bind_key not in self._failed,
+                    "failedSeconds": (None if bind_key not in self._failed
+                                      else round(now - self._failed[bind_key], 1)),
+                    "reads": self.reads[bind_key],
+                } for bind_key in self.bind_keys],
+                "fallbacks": self.fallbacks,
+                "stickySeconds": self.sticky_seconds,
+            }
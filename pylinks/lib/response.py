@@ -1,10 +1,84 @@
 """
 Lib for creating standardized response from this component.
+
+Json is encoded by `dumps`, which uses orjson when it is installed (and allowed by
+`Config.JSON_BACKEND`), stdlib json otherwise. Datetimes are always written in
+`Config.JSON_DATETIME_FORMAT`: "http" (RFC 822, the format of flask `jsonify`) or "iso".
+
+Responses are compressed when the client accepts it (see `lib.compress`): json bodies
+of at least `Config.COMPRESSION_MIN_SIZE` bytes, streamed bodies always.
+
+These settings are replaced by config of the application by `init_app`.
 """
 
-from flask import make_response, jsonify, Response
+from datetime import date, datetime
+from decimal import Decimal
 import json
 
+from flask import make_response, Response
+from werkzeug.http import http_date
+
+from config import Config
+from lib.compress import negotiate_encoding, compress, compress_chunks
+from lib.metrics import timed
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Number of items serialized into one chunk of streamed response.
+STREAM_CHUNK_SIZE = 500
+
+
+DATETIME_FORMATS = {
+    "http": http_date,
+    "iso": lambda value: value.isoformat(),
+}
+
+_format_datetime = DATETIME_FORMATS[Config.JSON_DATETIME_FORMAT]
+_compression_min_size = Config.COMPRESSION_MIN_SIZE
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return _format_datetime(value)
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError("Object of type {} is not JSON serializable".format(
+        type(value).__name__))
+
+
+def _orjson_dumps(obj):
+    return orjson.dumps(obj, default=_default,
+                        option=orjson.OPT_PASSTHROUGH_DATETIME).decode('utf-8')
+
+
+def _json_dumps(obj):
+    return json.dumps(obj, default=_default, separators=(',', ':'))
+
+
+def _select_dumps(backend):
+    if backend == 'json' or (backend == 'auto' and orjson is None):
+        return _json_dumps
+    if orjson is None:
+        raise ImportError("JSON_BACKEND={} requires orjson to be installed.".format(backend))
+    return _orjson_dumps
+
+
+dumps = _select_dumps(Config.JSON_BACKEND)
+
+
+def init_app(app):
+    """
+    Render responses by json backend, datetime format and compression threshold
+    of `app` config (process wide).
+    """
+    global dumps, _format_datetime, _compression_min_size
+    dumps = _select_dumps(app.config['JSON_BACKEND'])
+    _format_datetime = DATETIME_FORMATS[app.config['JSON_DATETIME_FORMAT']]
+    _compression_min_size = app.config['COMPRESSION_MIN_SIZE']
+
 
 def make_json_response(status_code, data, links=None, meta=None):
     """
@@ -22,20 +96,42 @@ def make_json_response(status_code, data, links=None, meta=None):
     if meta is not None:
         result_json['meta'] = meta
 
-    return make_response(jsonify(result_json), status_code)
+    with timed("render"):
+        body = dumps(result_json).encode('utf-8')
+        headers = {'Content-Type': 'application/json', 'Vary': 'Accept-Encoding'}
+        if len(body) >= _compression_min_size:
+            encoding = negotiate_encoding()
+            if encoding is not None:
+                body = compress(body, encoding)
+                headers['Content-Encoding'] = encoding
+        return make_response(body, status_code, headers)
+
+
+def make_json_error_response(status_code, errors, headers=None):
+    """
+    Create an error response in the format of argument errors (see `param_check.handle_error`).
+    """
+    with timed("render"):
+        return make_response(dumps({'errors': errors, 'status': status_code}), status_code,
+                             dict(headers or {}, **{'Content-Type': 'application/json'}))
 
 
 def make_streamed_response(status_code, data_generator, content_type='application/json'):
+    headers = {'Vary': 'Accept-Encoding'}
+    encoding = negotiate_encoding()
+    if encoding is not None:
+        data_generator = compress_chunks(data_generator, encoding)
+        headers['Content-Encoding'] = encoding
     return Response(
-        data_generator, content_type=content_type, status=status_code)
+        data_generator, content_type=content_type, status=status_code, headers=headers)
 
 
 def make_streamed_json_response(status_code, data_generator, links=None, meta=None):
     def generate(status_code, data_generator, links, meta):
         yield '{{"status":{}{}{}, "data": '.format(
             status_code,
-            ', "links": {}'.format(json.dumps(links)) if links is not None else '',
-            ', "meta": {}'.format(json.dumps(meta)) if meta is not None else ''
+            ', "links": {}'.format(dumps(links)) if links is not None else '',
+            ', "meta": {}'.format(dumps(meta)) if meta is not None else ''
         )
         try:
             yield next(data_generator)
@@ -54,3 +150,41 @@ def make_streamed_json_response(status_code, data_generator, links=None, meta=No
         status_code,
         generate(status_code, data_generator, links, meta),
         content_type='application/json')
+
+
+def make_streamed_ndjson_response(status_code, data_generator):
+    return make_streamed_response(
+        status_code, data_generator, content_type='application/x-ndjson')
+
+
+def json_array_chunks(items, prefix='[', suffix=']', chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Serialize iterable of json serializable `items` into json array chunk by chunk.
+    Output is suitable as `data_generator` of `make_streamed_json_response`.
+    """
+    buffer = [prefix]
+    separator = ''
+    for item in items:
+        buffer.append(separator)
+        buffer.append(dumps(item))
+        separator = ','
+        if len(buffer) >= 2 * chunk_size:
+            yield ''.join(buffer)
+            buffer = []
+    buffer.append(suffix)
+    yield ''.join(buffer)
+
+
+def ndjson_chunks(items, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Serialize iterable of json serializable `items` as newline delimited json chunk by chunk.
+    """
+    buffer = []
+    for item in items:
+        buffer.append(dumps(item))
+        buffer.append('\n')
+        if len(buffer) >= 2 * chunk_size:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
@@ -0,0 +1,91 @@
+"""
+Lib for serializing query rows (column tuples) straight into json-ready dicts.
+
+`RowSerializer` takes a template - dict describing output object whose values are
+sqlalchemy columns - and compiles it once into a python function building the dict
+from a row by position. Query selects `serializer.columns`, so no ORM objects
+are hydrated and no attribute lookups are done per row.
+
+Template values:
+* column - value of the column,
+* `IsNull(column)` - True when the column is NULL,
+* `Between(column, low, high)` - True when the column is not NULL and in [low, high],
+* `Optional(column, template)` - None when the column is NULL, nested object otherwise,
+* dict - nested object.
+
+Example usage::
+    serializer = RowSerializer({
+        "id": Link.id,
+        "active": IsNull(Link.active),
+        "category": {"id": Category.id, "name": Category.name},
+    })
+    rows = db.session.query(*serializer.columns).join(Link.category)
+    result = [serializer(row) for row in rows]
+"""
+
+
+class IsNull:
+
+    def __init__(self, column):
+        self.column = column
+
+
+class Between:
+
+    def __init__(self, column, low, high):
+        self.column = column
+        self.low = low
+        self.high = high
+
+
+class Optional:
+
+    def __init__(self, column, template):
+        self.column = column
+        self.template = template
+
+
+class RowSerializer:
+
+    def __init__(self, template):
+        self.columns = []
+        self._indexes = {}
+        source = 'def serialize(row):\n    return {}\n'.format(self._compile(template))
+        namespace = {}
+        exec(compile(source, '<RowSerializer>', 'exec'), namespace)
+        self.source = source
+        self._serialize = namespace['serialize']
+
+    def index(self, column):
+        """
+        Position of `column` in selected row, column is added to selected columns if needed.
+        """
+        key = id(column)
+        if key not in self._indexes:
+            self._indexes[key] = len(self.columns)
+            self.columns.append(column.label('c{}'.format(len(self.columns))))
+        return self._indexes[key]
+
+    def _compile(self, value):
+        if isinstance(value, dict):
+            return '{{{}}}'.format(', '.join(
+                '{!r}: {}'.format(key, self._compile(item)) for key, item in value.items()))
+        if isinstance(value, IsNull):
+            return '(row[{}] is None)'.format(self.index(value.column))
+        if isinstance(value, Between):
+            index = self.index(value.column)
+            return '(row[{0}] is not None and {1!r} <= row[{0}] <= {2!r})'.format(
+                index, value.low, value.high)
+        if isinstance(value, Optional):
+            return '(None if row[{}] is None else {})'.format(
+                self.index(value.column), self._compile(value.template))
+        return 'row[{}]'.format(self.index(value))
+
+    def values(self, row, columns):
+        """
+        Values of `columns` (which must be part of the template) in `row`.
+        """
+        return [row[self._indexes[id(column)]] for column in columns]
+
+    def __call__(self, row):
+        return self._serialize(row)
@@ -0,0 +1,46 @@
+"""
+Lib for canonical form of urls and their fixed-width hashes.
+
+Urls which differ only in case of scheme and host, default port, empty or trailing
+slash of the path, order of query parameters or fragment have the same canonical form::
+
+    HTTP://Example.com:80/a/?b=2&a=1#top -> http://example.com/a?a=1&b=2
+
+`url_hash` is a signed 64-bit integer (fits BIGINT of every database) of the canonical
+form, its index is several times narrower than the index of the url itself.
+The chance of two different urls colliding is negligible (~n^2 / 2^65 for n urls).
+"""
+
+import hashlib
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+DEFAULT_PORTS = {'http': 80, 'https': 443, 'ftp': 21}
+
+
+def canonical_url(url):
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').rstrip('.')
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = '[{}]'.format(host) if ':' in host else host
+    if parts.username is not None:
+        userinfo = parts.username
+        if parts.password is not None:
+            userinfo += ':' + parts.password
+        netloc = userinfo + '@' + netloc
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        netloc += ':{}'.format(port)
+    path = parts.path.rstrip('/') or '/'
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+def url_hash(url):
+    """
+    Hash of canonical form of `url`.
+    """
+    digest = hashlib.blake2b(canonical_url(url).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
@@ -1,12 +1,75 @@
+"""
+Application factory and extensions shared by all modules.
+
+Importing this package creates no application, engine or connection. `create_app`
+builds the application from a config object and registers `MODULES`, their resources
+and models are imported only then.
+
+Example usage::
+    app = create_app()
+    with app.app_context():
+        ...
+"""
+
+import importlib
+
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flask_restful import Api
+from werkzeug.middleware.proxy_fix import ProxyFix
 from config import Config
+from lib.cache import ResponseCache
+from lib.pool import engine_options
+from lib.metrics import RequestMetrics
+from lib.replica import ReplicaSet, RoutingSession
+from lib.admission import Admission
+from lib import compress, param_check, response
 
 DEFAULT_GET_LIMIT = 100
 
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = ('mysql+pymysql://{}:{}@{}:{}/{}?charset=utf8'.format(
-  Config.DB_USER, Config.DB_PASS, Config.DB_HOST, Config.DB_PORT, Config.DATABASE))
-db = SQLAlchemy(app)
-api = Api(app)
+# Modules with `register(app, **kwargs)` registered by `create_app`.
+MODULES = ['links.link.resources', 'links.misc.resources', ]
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+response_cache = ResponseCache(Config.RESPONSE_CACHE_SIZE, Config.RESPONSE_CACHE_TTL)
+request_metrics = RequestMetrics()
+read_replicas = ReplicaSet([], Config.DB_REPLICA_STICKY_SECONDS, Config.DB_REPLICA_RETRY_INTERVAL)
+admission = Admission()
+
+
+def database_uri(config):
+    return config.DATABASE_URI or 'mysql+pymysql://{}:{}@{}:{}/{}?charset=utf8'.format(
+        config.DB_USER, config.DB_PASS, config.DB_HOST, config.DB_PORT, config.DATABASE)
+
+
+def create_app(config=Config, modules=MODULES, url_prefix='/api/v1'):
+    """
+    Application configured by `config` (object with upper case settings, see `Config`)
+    with `modules` registered under `url_prefix`.
+    """
+    app = Flask(__name__)
+    app.config.from_object(config)
+    if config.PROXY_FIX_HOPS:
+        hops = config.PROXY_FIX_HOPS
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
+    uri = database_uri(config)
+    pool_options = (config.DB_POOL_SIZE, config.DB_MAX_OVERFLOW, config.DB_POOL_RECYCLE,
+                    config.DB_POOL_PRE_PING, config.DB_POOL_TIMEOUT)
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(uri, *pool_options)
+    replica_uris = [uri.strip() for uri in config.DB_REPLICA_URIS.split(',') if uri.strip()]
+    app.config['SQLALCHEMY_BINDS'] = {
+        'replica{}'.format(i): dict(engine_options(replica_uri, *pool_options), url=replica_uri)
+        for i, replica_uri in enumerate(replica_uris)}
+
+    db.init_app(app)
+    response_cache.init_app(app)
+    if config.METRICS_ENABLED:
+        request_metrics.init_app(app)
+    read_replicas.init_app(app, db)
+    admission.init_app(app)
+    response.init_app(app)
+    compress.init_app(app)
+    param_check.init_app(app)
+    for module_name in modules:
+        importlib.import_module(module_name).register(app, url_prefix=url_prefix)
+    return app
@@ -0,0 +1,121 @@
+"""
+Backfill of `Link.url_hash` for rows created before the column existed.
+
+Rows are processed in batches of `--batch-size` ordered by id, every batch is one short
+transaction (a single executemany UPDATE), optionally followed by `--sleep` seconds
+so the job does not starve the application. The job can be stopped and run again
+at any time, only rows without hash are read.
+
+Links whose canonical url is already taken by another link (near-duplicates such as
+trailing slash or different case of the host) can not get the hash because of the unique
+index. They are left without it and reported, merge or delete them and run the job again.
+A batch which meets such a link inserted or hashed concurrently is rolled back and hashed
+again row by row.
+
+Usage (from pylinks directory)::
+    python -m links.link.backfill --batch-size 1000 --sleep 0.1
+"""
+
+import argparse
+import time
+
+from sqlalchemy import bindparam
+from sqlalchemy.exc import IntegrityError
+
+from links import create_app, db
+from lib.urls import url_hash
+from .models import Link
+
+
+def _update_hashes(updates):
+    table = Link.__table__
+    db.session.execute(table.update().where(table.c.id == bindparam('link_id'))
+                       .values(url_hash=bindparam('hash')), updates)
+    db.session.commit()
+
+
+def _update_hashes_one_by_one(updates, links):
+    """
+    Hash links of `updates` each in its own transaction.
+    Returns (number of hashed links, list of duplicates as in `backfill_batch`).
+    """
+    hashed = 0
+    duplicates = []
+    for update in updates:
+        try:
+            _update_hashes([update])
+            hashed += 1
+        except IntegrityError:
+            db.session.rollback()
+            owner = db.session.query(Link.id).filter(Link.url_hash == update["hash"]).scalar()
+            db.session.rollback()
+            duplicates.append((update["link_id"], links[update["link_id"]], owner))
+    return hashed, duplicates
+
+
+def backfill_batch(after_id, batch_size):
+    """
+    Hash up to `batch_size` links with id greater than `after_id`.
+    Returns (last processed id or None when there is nothing left, number of hashed links,
+    list of (id, link, id of the link with the same canonical url) of duplicates).
+    """
+    rows = (db.session.query(Link.id, Link.link)
+            .filter(Link.url_hash.is_(None), Link.id > after_id)
+            .order_by(Link.id).limit(batch_size).all())
+    if not rows:
+        db.session.rollback()
+        return None, 0, []
+    hashes = {link_id: url_hash(link) for link_id, link in rows}
+    owners = dict(db.session.query(Link.url_hash, Link.id)
+                  .filter(Link.url_hash.in_(set(hashes.values()))))
+    updates = []
+    duplicates = []
+    for link_id, link in rows:
+        owner = owners.setdefault(hashes[link_id], link_id)
+        if owner == link_id:
+            updates.append({"link_id": link_id, "hash": hashes[link_id]})
+        else:
+            duplicates.append((link_id, link, owner))
+    if not updates:
+        db.session.rollback()
+        return rows[-1][0], 0, duplicates
+    try:
+        _update_hashes(updates)
+    except IntegrityError:
+        # Link with the same canonical url was hashed or inserted after the owners query.
+        db.session.rollback()
+        hashed, conflicts = _update_hashes_one_by_one(updates, dict(rows))
+        return rows[-1][0], hashed, duplicates + conflicts
+    return rows[-1][0], len(updates), duplicates
+
+
+def backfill_url_hashes(batch_size, sleep=0):
+    after_id = 0
+    hashed = 0
+    while True:
+        after_id, count, duplicates = backfill_batch(after_id, batch_size)
+        if after_id is None:
+            return hashed
+        hashed += count
+        for link_id, link, owner in duplicates:
+            print('link {} {!r} duplicates link {}'.format(link_id, link, owner))
+        if sleep:
+            time.sleep(sleep)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    arg_parser.add_argument('--batch-size', type=int, default=1000)
+    arg_parser.add_argument('--sleep', type=float, default=0,
+                            help='seconds to sleep between batches')
+    options = arg_parser.parse_args()
+
+    app = create_app(modules=[])
+    with app.app_context():
+        start = time.monotonic()
+        hashed = backfill_url_hashes(options.batch_size, options.sleep)
+        print('hashed {} links in {:.1f} s'.format(hashed, time.monotonic() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""
+Background checker of link liveness.
+
+Links are probed concurrently by a bounded pool of threads. Requests to one host are
+spaced by at least `host_interval` seconds, so checking many links of one site does not
+hammer it. Every link is probed with HEAD first; servers which do not support HEAD
+(answer it with an error status or a broken response) get GET. Unreachable servers
+and timeouts are not retried. Status, latency (of the request only, without waiting
+for the host rate limit) and time of the check are stored in `LinkCheck`, links checked
+longest ago go first.
+
+Usage (from pylinks directory)::
+    python -m links.link.checker --concurrency 32 --interval 3600
+"""
+
+import argparse
+import http.client
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from config import Config
+from links import create_app, db
+from links.unit_of_work import unit_of_work, persist
+from .models import Link, LinkCheck
+
+USER_AGENT = 'pylinks-checker/1.0'
+# Failures of one probe: unreachable host, timeout, malformed url or broken HTTP response.
+PROBE_ERRORS = (urllib.error.URLError, http.client.HTTPException, OSError, ValueError)
+
+
+class CheckResult:
+
+    __slots__ = ('link_id', 'status', 'latency', 'error', 'checked')
+
+    def __init__(self, link_id, status, latency, error, checked):
+        self.link_id = link_id
+        self.status = status
+        self.latency = latency
+        self.error = error
+        self.checked = checked
+
+    def __repr__(self):
+        return '<CheckResult link_id=%d status=%r>' % (self.link_id, self.status)
+
+
+class HostRateLimiter:
+    """
+    Allows at most one request per `interval` seconds to every host.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._next_allowed = {}
+
+    def wait(self, host):
+        with self._lock:
+            now = time.monotonic()
+            allowed = max(now, self._next_allowed.get(host, now))
+            self._next_allowed[host] = allowed + self.interval
+        if allowed > now:
+            time.sleep(allowed - now)
+
+
+class LinkChecker:
+
+    def __init__(self, concurrency=Config.LINK_CHECK_CONCURRENCY,
+                 timeout=Config.LINK_CHECK_TIMEOUT,
+                 host_interval=Config.LINK_CHECK_HOST_INTERVAL):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.rate_limiter = HostRateLimiter(host_interval)
+
+    def _request(self, url, method):
+        """
+        Tuple (status, latency in seconds, exception or None) of one request to `url`,
+        sent once the host rate limit allows it.
+        """
+        try:
+            self.rate_limiter.wait(urlsplit(url).hostname or '')
+        except ValueError as err:
+            return None, 0, err
+        request = urllib.request.Request(url, method=method, headers={'User-Agent': USER_AGENT})
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                status = response.status
+        except urllib.error.HTTPError as err:
+            status = err.code
+        except PROBE_ERRORS as err:
+            return None, time.perf_counter() - start, err
+        return status, time.perf_counter() - start, None
+
+    def probe(self, link_id, url):
+        """
+        Check one `url`, HEAD first and GET if HEAD got error status or broken response.
+        """
+        status, latency, err = self._request(url, 'HEAD')
+        if (err is None and status >= 400) or isinstance(err, http.client.HTTPException):
+            status, latency, err = self._request(url, 'GET')
+        error = None
+        if err is not None:
+            error = (str(getattr(err, 'reason', err)).strip() or type(err).__name__)[:200]
+        return CheckResult(link_id, status, round(latency * 1000, 3), error, datetime.now())
+
+    def check(self, links):
+        """
+        Probe iterable of (link_id, url) tuples concurrently, returns list of `CheckResult`.
+        """
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            return list(executor.map(lambda link: self.probe(*link), links))
+
+
+def store_results(results):
+    existing = {check.link_id: check for check in LinkCheck.query.filter(
+        LinkCheck.link_id.in_([result.link_id for result in results]))}
+    with unit_of_work():
+        for result in results:
+            check = existing.get(result.link_id)
+            if check is None:
+                check = LinkCheck(link_id=result.link_id)
+            check.status = result.status
+            check.latency = result.latency
+            check.error = result.error
+            check.checked = result.checked
+            persist(check)
+
+
+def check_links(checker, batch_size=Config.LINK_CHECK_BATCH_SIZE, limit=None):
+    """
+    Check active links, the ones never checked or checked longest ago first.
+    Results are stored after every batch. Returns number of checked links.
+    """
+    query = (db.session.query(Link.id, Link.link).outerjoin(LinkCheck)
+             .filter(Link.active.is_(None))
+             .order_by(LinkCheck.checked.isnot(None), LinkCheck.checked, Link.id))
+    if limit is not None:
+        query = query.limit(limit)
+    links = query.all()
+    for start in range(0, len(links), batch_size):
+        store_results(checker.check(links[start:start + batch_size]))
+    return len(links)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    arg_parser.add_argument('--concurrency', type=int, default=Config.LINK_CHECK_CONCURRENCY)
+    arg_parser.add_argument('--timeout', type=float, default=Config.LINK_CHECK_TIMEOUT)
+    arg_parser.add_argument('--host-interval', type=float,
+                            default=Config.LINK_CHECK_HOST_INTERVAL)
+    arg_parser.add_argument('--limit', type=int, default=None,
+                            help='check at most this number of links in one run')
+    arg_parser.add_argument('--interval', type=float, default=0,
+                            help='repeat the check every INTERVAL seconds, 0 runs once')
+    options = arg_parser.parse_args()
+
+    app = create_app(modules=[])
+    checker = LinkChecker(options.concurrency, options.timeout, options.host_interval)
+    while True:
+        with app.app_context():
+            start = time.monotonic()
+            count = check_links(checker, limit=options.limit)
+            print('checked {} links in {:.1f} s'.format(count, time.monotonic() - start))
+        if not options.interval:
+            break
+        time.sleep(options.interval)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Reconciliation of category link counts.
+
+`Category.link_count` / `Category.total_link_count` are maintained incrementally by
+`Link.save` / `Link.delete`. They drift when links are written around the models
+(raw SQL, imports) or when the ancestors of a category were taken from a stale
+`category_tree` of another process. This job recounts active links with one GROUP BY
+query, rolls them up the hierarchy and fixes categories whose counts differ.
+
+Drift caused by writes running concurrently with the job is fixed by its next run.
+
+Usage (from pylinks directory)::
+    python -m links.link.counts --interval 3600
+"""
+
+import argparse
+import time
+
+from sqlalchemy import bindparam
+
+from links import create_app, db
+from .models import Category, Link
+
+
+def expected_link_counts():
+    """
+    Dict category id -> (link count, total link count) computed from links.
+    """
+    counts = dict(db.session.query(Link.category_id, db.func.count(Link.id))
+                  .filter(Link.active.is_(None), Link.category_id.isnot(None))
+                  .group_by(Link.category_id))
+    parents = dict(db.session.query(Category.id, Category.parent_id))
+    totals = dict.fromkeys(parents, 0)
+    for category_id, count in counts.items():
+        seen = set()
+        # Walk to the root, guarding against cycles in the data.
+        while category_id in totals and category_id not in seen:
+            seen.add(category_id)
+            totals[category_id] += count
+            category_id = parents[category_id]
+    return {category_id: (counts.get(category_id, 0), total)
+            for category_id, total in totals.items()}
+
+
+def reconcile_link_counts(dry_run=False):
+    """
+    Fix categories with wrong link counts.
+    Returns list of (category id, stored counts, expected counts) of fixed categories.
+    """
+    expected = expected_link_counts()
+    stored = db.session.query(Category.id, Category.link_count, Category.total_link_count)
+    drift = [(category_id, (link_count, total_link_count), expected[category_id])
+             for category_id, link_count, total_link_count in stored
+             if expected.get(category_id, (0, 0)) != (link_count, total_link_count)]
+    if drift and not dry_run:
+        table = Category.__table__
+        db.session.execute(
+            table.update().where(table.c.id == bindparam('category_id')).values(
+                link_count=bindparam('own'), total_link_count=bindparam('total')),
+            [{"category_id": category_id, "own": own, "total": total}
+             for category_id, _, (own, total) in drift])
+    db.session.commit()
+    return drift
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    arg_parser.add_argument('--dry-run', action='store_true',
+                            help='only report categories with wrong counts')
+    arg_parser.add_argument('--interval', type=float, default=0,
+                            help='repeat the job every INTERVAL seconds, 0 runs once')
+    options = arg_parser.parse_args()
+
+    app = create_app(modules=[])
+    while True:
+        with app.app_context():
+            start = time.monotonic()
+            drift = reconcile_link_counts(options.dry_run)
+            for category_id, stored, expected in drift:
+                print('category {}: stored {} expected {}'.format(category_id, stored, expected))
+            print('{} {} categories in {:.1f} s'.format(
+                'found' if options.dry_run else 'fixed', len(drift), time.monotonic() - start))
+        if not options.interval:
+            break
+        time.sleep(options.interval)
+
+
+if __name__ == '__main__':
+    main()
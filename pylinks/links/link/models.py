@@ -1,31 +1,45 @@
 from datetime import datetime
 
-from links import db
+from sqlalchemy import inspect
+from sqlalchemy.orm import configure_mappers, validates
+
+from links import db, response_cache
+from links.unit_of_work import persist, commit
+from lib.changelog import ChangeLog, CREATE
+from lib.cache import skip_cache
+from lib.serialize import RowSerializer, IsNull, Between, Optional
+from lib.urls import url_hash
+from .tree import CategoryTree
+from .search import LinkSearchIndex
 
 
 class Category(db.Model):
 
     __tablename__ = 'category'
+    # Indexes are created by migrations (migrations/0002_list_indexes.py), keep them in sync.
+    __table_args__ = (
+        db.Index('ix_category_active_id', 'active', 'id'),
+        db.Index('ix_category_active_created', 'active', 'created', 'id'),
+        db.Index('ix_category_parent_id', 'parent_id'),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     name = db.Column(db.String(50), unique=True)
     parent_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=True)
     active = db.Column(db.DateTime, nullable=True)
-    created = db.Column(db.DateTime, default=db.func.now())
+    created = db.Column(db.DateTime, default=datetime.now)
+    # Active links in the category itself / including all descendants. Maintained
+    # incrementally by `Link.save` / `Link.delete`, fixed by `links.link.counts`.
+    link_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    total_link_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Many-to-one loads go through session identity map, so parent already loaded
+    # in current request is not queried again. Serialization uses `category_tree` instead.
+    parent = db.relationship(
+        'Category', remote_side=[id], backref=db.backref('children')
+    )
 
-    def __init__(self, name, parent_category):
+    def __init__(self, name, parent_id=None):
         self.name = name
-        self.parent_id = parent_category.id
-
-    @property
-    def parent(self):
-        if self.parent_id:
-            return Category.query.filter_by(id=self.parent_id)[0]
-        else:
-            return None
-
-    @property
-    def children(self):
-        return Category.query.filter_by(parent_id=self.id).all()
+        self.parent_id = parent_id
 
     def to_json(self, detailed=False):
         json_result = {
@@ -35,17 +49,44 @@ class Category(db.Model):
             "created": self.created,
         }
         if detailed:
-            json_result["parent"] = None if self.parent is None else self.parent.to_json()
+            parent = None if self.parent_id is None else category_tree.get(self.parent_id)
+            if parent is None and self.parent_id is not None:
+                # Parent is not in the tree even after reload, do not cache the response.
+                skip_cache()
+            json_result["parent"] = None if parent is None else parent.to_json()
+            json_result["linkCount"] = self.link_count
+            json_result["totalLinkCount"] = self.total_link_count
         return json_result
 
+    def _after_commit(self):
+        category_tree.update(self)
+        response_cache.invalidate("categories", "category:{}".format(self.id))
+
+    def _move_link_counts(self):
+        """
+        Move total link count of the subtree from old ancestors to new ones.
+        """
+        added, _, deleted = inspect(self).attrs.parent_id.history
+        if not deleted or not added or deleted[0] == added[0] or not self.total_link_count:
+            return []
+        old_parent_id, new_parent_id = deleted[0], added[0]
+        tags = ["category:{}".format(self.id)]
+        tags += update_link_counts(old_parent_id, -self.total_link_count, rollup_only=True)
+        tags += update_link_counts(new_parent_id, self.total_link_count, rollup_only=True)
+        return tags
+
     def save(self):
-        db.session.add(self)
-        db.commit()
+        tags = self._move_link_counts()
+
+        def after_commit():
+            self._after_commit()
+            response_cache.invalidate(*tags)
+
+        persist(self, after_commit)
 
     def delete(self):
         self.active = datetime.now()
-        db.session.add(self)
-        db.commit()
+        persist(self, self._after_commit)
 
     def __repr__(self):
         return '<Category id=%d name=%r>' % (self.id, self.name)
@@ -54,21 +95,34 @@ class Category(db.Model):
 class Link(db.Model):
 
     __tablename__ = 'link'
+    __table_args__ = (
+        db.Index('ix_link_active_id', 'active', 'id'),
+        db.Index('ix_link_active_created', 'active', 'created', 'id'),
+        db.Index('ix_link_category_id', 'category_id'),
+        db.Index('uq_link_url_hash', 'url_hash', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     name = db.Column(db.String(50), unique=True)
     link = db.Column(db.String(100), unique=True)
+    # Hash of canonical form of `link` (see `lib.urls`), unique among links. Null only
+    # for rows not yet filled by `links.link.backfill`.
+    url_hash = db.Column(db.BigInteger, nullable=True)
     category_id = db.Column(db.Integer, db.ForeignKey('category.id'))
     category = db.relationship(
         'Category', backref=db.backref('links', lazy='dynamic')
     )
     active = db.Column(db.DateTime, nullable=True)
-    created = db.Column(db.DateTime, default=db.func.now())
+    created = db.Column(db.DateTime, default=datetime.now)
 
-    def __init__(self, name, link, category):
+    def __init__(self, name, link, category_id):
         self.name = name
         self.link = link
-        self.category = category
-        self.category_id = category.id
+        self.category_id = category_id
+
+    @validates('link')
+    def _set_url_hash(self, key, link):
+        self.url_hash = None if link is None else url_hash(link)
+        return link
 
     def to_json(self):
         return {
@@ -78,16 +132,216 @@ class Link(db.Model):
             "category": self.category.to_json(),
             "active": self.active is None,
             "created": self.created,
+            "check": None if self.check is None else self.check.to_json(),
         }
 
+    def _after_commit(self):
+        search_index.update(self.id, self.name, self.link, self.active)
+        response_cache.invalidate("links", "link:{}".format(self.id))
+
+    def _link_count_deltas(self):
+        """
+        Dict category id -> change of active link count caused by saving this link.
+        """
+        state = inspect(self)
+        counted = self.active is None and self.category_id is not None
+        if state.persistent:
+            old = {}
+            for name in ('category_id', 'active'):
+                added, unchanged, deleted = state.attrs[name].history
+                old[name] = deleted[0] if deleted else getattr(self, name)
+            was_counted = old['active'] is None and old['category_id'] is not None
+            old_category_id = old['category_id']
+        else:
+            was_counted = False
+            old_category_id = None
+        deltas = {}
+        if was_counted:
+            deltas[old_category_id] = -1
+        if counted:
+            deltas[self.category_id] = deltas.get(self.category_id, 0) + 1
+        return {category_id: delta for category_id, delta in deltas.items() if delta}
+
+    def _persist(self):
+        tags = []
+        for category_id, delta in self._link_count_deltas().items():
+            tags += update_link_counts(category_id, delta)
+
+        def after_commit():
+            self._after_commit()
+            if tags:
+                response_cache.invalidate("categories", *tags)
+
+        persist(self, after_commit)
+
     def save(self):
-        db.session.add(self)
-        db.commit()
+        self._persist()
 
     def delete(self):
         self.active = datetime.now()
-        db.session.add(self)
-        db.commit()
+        self._persist()
+
+    @classmethod
+    def bulk_insert(cls, rows):
+        """
+        Insert `rows` (dicts with name, link and category_id) with single executemany
+        in one transaction (of running unit of work, if any).
+        Returns dict name -> id of inserted links.
+        """
+        if not rows:
+            return {}
+        rows = [dict(row, url_hash=url_hash(row["link"])) for row in rows]
+        db.session.execute(cls.__table__.insert(), rows)
+        names = [row["name"] for row in rows]
+        ids = dict(db.session.query(cls.name, cls.id).filter(cls.name.in_(names)))
+        deltas = {}
+        for row in rows:
+            deltas[row["category_id"]] = deltas.get(row["category_id"], 0) + 1
+        tags = []
+        for category_id, delta in deltas.items():
+            tags += update_link_counts(category_id, delta)
+
+        change_log.record(db.session, "link", [ids[name] for name in names], CREATE)
+
+        def after_commit():
+            for row in rows:
+                search_index.update(ids[row["name"]], row["name"], row["link"])
+            response_cache.invalidate("links", "categories", *tags)
+
+        commit(after_commit)
+        return ids
 
     def __repr__(self):
         return '<Link id=%d name=%r>' % (self.id, self.name)
+
+
+class LinkCheck(db.Model):
+    """
+    Result of the last liveness check of a link, see `links.link.checker`.
+    `status` is None when the server could not be reached at all.
+    """
+
+    __tablename__ = 'link_check'
+    link_id = db.Column(db.Integer, db.ForeignKey('link.id'), primary_key=True)
+    link = db.relationship(
+        'Link', backref=db.backref('check', uselist=False, lazy='joined')
+    )
+    status = db.Column(db.Integer, nullable=True)
+    latency = db.Column(db.Float, nullable=True)
+    error = db.Column(db.String(200), nullable=True)
+    checked = db.Column(db.DateTime, nullable=False)
+
+    @property
+    def alive(self):
+        return self.status is not None and 200 <= self.status < 400
+
+    def to_json(self):
+        return {
+            "status": self.status,
+            "alive": self.alive,
+            "latency": self.latency,
+            "error": self.error,
+            "checked": self.checked,
+        }
+
+    def __repr__(self):
+        return '<LinkCheck link_id=%d status=%r>' % (self.link_id, self.status)
+
+
+class Change(db.Model):
+    """
+    Entry of the change log of links and categories, see `lib.changelog`.
+    Id is the position in the log, GET /changes pages by it.
+    """
+
+    __tablename__ = 'change_log'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    entity = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    action = db.Column(db.String(10), nullable=False)
+    created = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return '<Change id=%d %s %s:%d>' % (self.id, self.action, self.entity, self.entity_id)
+
+
+class ChangeLock(db.Model):
+    """
+    Single row locked by transactions writing the change log, see `lib.changelog`.
+    """
+
+    __tablename__ = 'change_log_lock'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+# Backrefs (e.g. `Link.check`) exist only once mappers are configured, which otherwise
+# happens with the first query.
+configure_mappers()
+
+category_tree = CategoryTree(Category)
+search_index = LinkSearchIndex(Link)
+change_log = ChangeLog(Change.__table__, ChangeLock.__table__,
+                       {Link: "link", Category: "category"})
+change_log.listen(db.session)
+
+
+def init_app(app):
+    """
+    Configure shared in-memory structures by `app` config.
+    """
+    category_tree.ttl = app.config['CATEGORY_TREE_TTL']
+    search_index.ttl = app.config['SEARCH_INDEX_TTL']
+
+
+def update_link_counts(category_id, delta, rollup_only=False):
+    """
+    Add `delta` to link count of category with `category_id` and to total link counts
+    of it and all its ancestors (only total counts if `rollup_only`), in the running
+    transaction. Returns cache tags of the changed categories.
+
+    Ancestors come from `category_tree`, counts left wrong by a stale tree (or by writes
+    bypassing models) are fixed by `links.link.counts`.
+    """
+    if category_id is None:
+        return []
+    path = category_tree.path(category_id)
+    category_ids = [node.id for node in path] if path else [category_id]
+    table = Category.__table__
+    if not rollup_only:
+        db.session.execute(table.update().where(table.c.id == category_id)
+                           .values(link_count=table.c.link_count + delta))
+    db.session.execute(table.update().where(table.c.id.in_(category_ids))
+                       .values(total_link_count=table.c.total_link_count + delta))
+    return ["category:{}".format(category_id) for category_id in category_ids]
+
+
+# Serializer of link rows producing the same json as `Link.to_json`, see `link_rows_query`.
+link_row_serializer = RowSerializer({
+    "id": Link.id,
+    "name": Link.name,
+    "link": Link.link,
+    "category": {
+        "id": Category.id,
+        "name": Category.name,
+        "active": IsNull(Category.active),
+        "created": Category.created,
+    },
+    "active": IsNull(Link.active),
+    "created": Link.created,
+    "check": Optional(LinkCheck.link_id, {
+        "status": LinkCheck.status,
+        "alive": Between(LinkCheck.status, 200, 399),
+        "latency": LinkCheck.latency,
+        "error": LinkCheck.error,
+        "checked": LinkCheck.checked,
+    }),
+})
+
+
+def link_rows_query():
+    """
+    Query selecting columns of `link_row_serializer`, without hydrating ORM objects.
+    """
+    return (db.session.query(*link_row_serializer.columns).select_from(Link)
+            .join(Link.category).outerjoin(Link.check))
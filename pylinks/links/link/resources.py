@@ -1,64 +1,291 @@
 from flask_restful import Resource, Api
-from flask import request, Blueprint
-from webargs import fields, ValidationError
+from flask import request, Blueprint, abort, stream_with_context
+from webargs import fields
+from marshmallow import Schema
 from marshmallow.validate import Length
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 
-from lib.response import make_json_response
-from lib.param_check import use_args, between, gt, is_url
-from lib.query import apply_limit_and_offset
+from lib.response import (make_json_response, make_streamed_json_response,
+                          make_streamed_ndjson_response, json_array_chunks, ndjson_chunks,
+                          STREAM_CHUNK_SIZE)
+from lib.param_check import (use_args, between, gt, is_url, is_cursor, one_of, not_both_args,
+                             abort_argument_error, load_items)
+from lib.query import paginate, page_query, encode_cursor, decode_cursor
+from lib.cache import add_cache_tags
+from lib.metrics import timed
+from lib.integrity import constraint_violation
+from lib.urls import canonical_url, url_hash
 
-from .models import Category, Link
-from links import DEFAULT_GET_LIMIT
+from .models import (Category, Link, LinkCheck, category_tree, search_index, change_log,
+                     link_row_serializer, link_rows_query, init_app as init_models)
+from links import DEFAULT_GET_LIMIT, db, response_cache, read_replicas, admission
+from links.unit_of_work import unit_of_work
+
+# Maximal number of links in one bulk import request.
+BULK_MAX_LINKS = 5000
+# Maximal number of ids fetched by one GET ?ids= request (kept under request line limits
+# of servers and proxies) and by one POST .../batch request.
+BATCH_GET_MAX_IDS = 200
+BATCH_POST_MAX_IDS = 1000
 
 
 blueprint = Blueprint('links', __name__)
-api = Api(blueprint)
-
-
-def exists_link(except_link_id=None, name=None, link=None):
-    if except_link_id is None and name is None and link is None:
-        raise ValueError("Link search, everything None, nothing to search.")
-    if except_link_id:
-        if name:
-            return (Link.query.filter(Link.name == name, Link.id != except_link_id).first()
-                    is not None)
-        elif link:
-            return (Link.query.filter(Link.link == link, Link.id != except_link_id).first()
-                    is not None)
-    else:
-        if name:
-            return Link.query.filter_by(name=name).first() is not None
-        elif link:
-            return Link.query.filter_by(link=link).first() is not None
+api = Api(blueprint, decorators=[read_replicas.fallback])
+
+
+def save_or_abort(obj, messages, foreign_keys=()):
+    """
+    Save `obj` with a single write, unique and foreign key violations are reported
+    as argument errors. `messages` maps violated column to (argument name, message).
+    """
+    try:
+        obj.save()
+    except IntegrityError as err:
+        db.session.rollback()
+        violation = constraint_violation(err, foreign_keys)
+        if violation is None or violation.column not in messages:
+            raise
+        abort_argument_error(*messages[violation.column])
+
+
+def link_messages(args):
+    link_message = ("link", "Link with link: {} already exists.".format(args["link"]))
+    return {
+        "name": ("name", "Link with name: {} already exists.".format(args["name"])),
+        "link": link_message,
+        "url_hash": link_message,
+        # MySQL reports name of the violated index instead of the column.
+        "uq_link_url_hash": link_message,
+        "category_id": ("categoryId", "Category with id: {} does not exist.".format(
+            args["categoryId"])),
+    }
+
+
+def category_messages(args):
+    return {
+        "name": ("name", "Category with name: {} already exists.".format(args["name"])),
+        "parent_id": ("parentId", "Category with id: {} does not exist.".format(
+            args["parentId"])),
+    }
+
+
+def find_bulk_conflicts(items):
+    """
+    Validate batch of new links with a few IN queries instead of queries per link.
+    Returns list with list of errors (in param_check error format) for every item.
+    """
+    names = {item["name"] for item in items}
+    urls = {item["link"] for item in items}
+    hashes = [url_hash(item["link"]) for item in items]
+    category_ids = {item["categoryId"] for item in items}
+    existing_names = {name for name, in Link.query.with_entities(Link.name)
+                      .filter(Link.name.in_(names))}
+    # Raw urls match also links which are not backfilled with url hash yet.
+    existing_hashes = set()
+    existing_urls = set()
+    for hash_value, url in Link.query.with_entities(Link.url_hash, Link.link).filter(
+            or_(Link.url_hash.in_(set(hashes)), Link.link.in_(urls))):
+        existing_hashes.add(hash_value)
+        existing_urls.add(url)
+    existing_category_ids = {category_id for category_id, in Category.query
+                             .with_entities(Category.id).filter(Category.id.in_(category_ids))}
+
+    seen_names = set()
+    seen_hashes = set()
+    result = []
+    for item, hash_value in zip(items, hashes):
+        errors = []
+        if item["name"] in existing_names or item["name"] in seen_names:
+            errors.append({"argumentName": "name", "messages": [
+                "Link with name: {} already exists.".format(item["name"])]})
+        if hash_value in existing_hashes or hash_value in seen_hashes or \
+                item["link"] in existing_urls:
+            errors.append({"argumentName": "link", "messages": [
+                "Link with link: {} already exists.".format(item["link"])]})
+        if item["categoryId"] not in existing_category_ids:
+            errors.append({"argumentName": "categoryId", "messages": [
+                "Category with id: {} does not exist.".format(item["categoryId"])]})
+        if not errors:
+            seen_names.add(item["name"])
+            seen_hashes.add(hash_value)
+        result.append(errors)
+    return result
+
+
+def link_row(item):
+    return {"name": item["name"], "link": item["link"], "category_id": item["categoryId"]}
+
+
+def insert_links_one_by_one(items, conflicts):
+    """
+    Insert `items` without `conflicts` (see `find_bulk_conflicts`) each in its own
+    transaction, unique and foreign key violations are added to errors of the item.
+    Returns dict name -> id of inserted links.
+    """
+    ids = {}
+    for item, errors in zip(items, conflicts):
+        if errors:
+            continue
+        try:
+            with unit_of_work():
+                ids.update(Link.bulk_insert([link_row(item)]))
+        except IntegrityError as err:
+            messages = link_messages(item)
+            violation = constraint_violation(err, ["category_id"])
+            if violation is None or violation.column not in messages:
+                raise
+            argument_name, message = messages[violation.column]
+            errors.append({"argumentName": argument_name, "messages": [message]})
+    return ids
+
+
+def batch_ids_arg(max_ids, location):
+    validate = Length(min=1, max=max_ids, error="Length must be between [{min}, {max}].")
+    if location == "query":
+        return fields.DelimitedList(fields.Int(validate=gt(0)), validate=validate)
+    return fields.List(fields.Int(validate=gt(0)), required=True, validate=validate)
+
+
+def links_by_ids(ids):
+    """
+    Dict id -> json of links with `ids` with their categories and checks, by single query.
+    The response is tagged with categories of found links.
+    """
+    result = {}
+    for row in link_rows_query().filter(Link.id.in_(ids)):
+        link_json = link_row_serializer(row)
+        result[link_json["id"]] = link_json
+    add_cache_tags("links", *{"category:{}".format(link["category"]["id"])
+                              for link in result.values()})
+    return result
+
+
+def categories_by_ids(ids):
+    """
+    Dict id -> detailed json (as in category lists) of categories with `ids`.
+    """
+    return {category.id: category.to_json(True)
+            for category in Category.query.filter(Category.id.in_(ids))}
+
+
+def batch_response(key, ids, fetch):
+    """
+    Response with objects fetched by `fetch(ids)` in order of `ids` (first occurrences)
+    under `key` and ids of objects which do not exist under "missing".
+    """
+    ids = list(dict.fromkeys(ids))
+    with timed("serialize"):
+        found = fetch(ids)
+    result = {key: [found[object_id] for object_id in ids if object_id in found],
+              "missing": [object_id for object_id in ids if object_id not in found]}
+    return make_json_response(200, result)
+
+
+def filter_by_check(query, args):
+    """
+    Apply liveness filters `alive` and `checkStatus` (see `links.link.checker`).
+    Links which were not checked yet match neither of them.
+    """
+    if args.get("alive") is True:
+        query = query.filter(Link.check.has(LinkCheck.status.between(200, 399)))
+    elif args.get("alive") is False:
+        query = query.filter(Link.check.has(or_(LinkCheck.status.is_(None),
+                                                LinkCheck.status < 200,
+                                                LinkCheck.status >= 400)))
+    if args.get("checkStatus") is not None:
+        query = query.filter(Link.check.has(LinkCheck.status == args["checkStatus"]))
+    return query
+
+
+# Orderings available for paging, last column must be unique to make cursors unambiguous.
+LINK_ORDERS = {
+    "id": (Link.id, ),
+    "created": (Link.created, Link.id),
+}
+
+CATEGORY_ORDERS = {
+    "id": (Category.id, ),
+    "created": (Category.created, Category.id),
+}
 
 
-def exists_category(except_category_id=None, name=None):
-    if name is None and except_category_id is None:
-        raise ValueError("Category search, everything None, nothing to search.")
-    if except_category_id and name:
-        return (Category.query.filter(Category.name == name,
-                                      Category.id != except_category_id).first() is not None)
-    elif name:
-        return Category.query.filter_by(name=name).first() is not None
-    raise ValueError("Invalid category search parameters combination.")
+def paging_args(orders):
+    return {
+        "limit": fields.Int(validate=between(1, 1000), missing=DEFAULT_GET_LIMIT),
+        "offset": fields.Int(missing=0, validate=gt(0)),
+        "after": fields.Str(validate=is_cursor),
+        "order": fields.Str(missing="id", validate=one_of(list(orders))),
+    }
 
 
-def get_category(category_id):
-    return Category.query.filter_by(id=category_id).first()
+def paginate_or_abort(query, orders, args, key_values=None):
+    try:
+        return paginate(query, orders[args["order"]], args["limit"], offset=args["offset"],
+                        after=args.get("after"), key_values=key_values)
+    except ValueError as err:
+        abort_argument_error("after", str(err))
+
+
+def page_query_or_abort(query, orders, args):
+    try:
+        return page_query(query, orders[args["order"]], args["limit"], offset=args["offset"],
+                          after=args.get("after"))
+    except ValueError as err:
+        abort_argument_error("after", str(err))
+
+
+def stream_links(query, output_format, wrap_key=None):
+    """
+    Stream links of `query` (see `link_rows_query`) fetched from server-side cursor
+    in chunks, so memory usage does not depend on number of links.
+    """
+    def generate_links():
+        try:
+            for row in query.yield_per(STREAM_CHUNK_SIZE):
+                yield link_row_serializer(row)
+        finally:
+            # Streaming outlives the request handler and its session scope,
+            # release the connection as soon as the cursor is consumed.
+            query.session.close()
+
+    links = generate_links()
+    if output_format == "ndjson":
+        return make_streamed_ndjson_response(200, stream_with_context(ndjson_chunks(links)))
+    if wrap_key is None:
+        chunks = json_array_chunks(links)
+    else:
+        chunks = json_array_chunks(links, prefix='{{"{}":['.format(wrap_key), suffix=']}')
+    return make_streamed_json_response(200, stream_with_context(chunks))
 
 
 @api.resource('/links')
 class LinkListResource(Resource):
 
-    @use_args({
-            "limit": fields.Int(validate=between(1, 1000), missing=DEFAULT_GET_LIMIT),
-            "offset": fields.Int(missing=0, validate=gt(0)),
-        }, location="query")
+    @response_cache.cached
+    @admission.limit_concurrency
+    @use_args(dict(paging_args(LINK_ORDERS), **{
+            "stream": fields.Bool(missing=False),
+            "alive": fields.Bool(),
+            "checkStatus": fields.Int(validate=between(100, 599)),
+            "ids": batch_ids_arg(BATCH_GET_MAX_IDS, "query"),
+        }), location="query", validate=[not_both_args("after", "offset"),
+                                        not_both_args("ids", "after")])
     def get(self, args):
-        query = apply_limit_and_offset(Link.query, args["limit"], args["offset"])
-        links = query.filter_by(active=None).all()
-        result = {'links': [link.to_json() for link in links]}
-        return make_json_response(200, result)
+        if "ids" in args:
+            return batch_response("links", args["ids"], links_by_ids)
+        query = filter_by_check(link_rows_query().filter(Link.active.is_(None)), args)
+        if args["stream"]:
+            # Next cursor is not known before the page is written, so it is not returned.
+            return stream_links(page_query_or_abort(query, LINK_ORDERS, args), "json",
+                                wrap_key="links")
+        rows, next_cursor = paginate_or_abort(query, LINK_ORDERS, args,
+                                              key_values=link_row_serializer.values)
+        with timed("serialize"):
+            links = [link_row_serializer(row) for row in rows]
+        add_cache_tags("links", *{"category:{}".format(link["category"]["id"]) for link in links})
+        return make_json_response(200, {'links': links}, links={'next': next_cursor})
 
     @use_args({
         "name": fields.Str(required=True, validate=(
@@ -67,38 +294,152 @@ class LinkListResource(Resource):
         "categoryId": fields.Int(required=True),
     }, location="json")
     def post(self, args):
-        # 1. name is unique (not in db yet)
-        if exists_link(name=args["name"]):
-            raise ValidationError("Link with name: {} already exists.".format(args["name"]))
-        # 2. link is unique
-        if exists_link(link=args["link"]):
-            raise ValidationError("Link with link: {} already exists.".format(args["link"]))
-        # 3. categoryId exists in db.
-        category = get_category(args["categoryId"])
-        if not category:
-            raise ValidationError("Category with id: {} does not exist.".format(args["categoryId"]))
-        new_link = Link(name=args["name"], link=args["link"], category=category)
-        new_link.save()
+        # Unique name and link and existing categoryId are checked by db constraints.
+        new_link = Link(name=args["name"], link=args["link"], category_id=args["categoryId"])
+        save_or_abort(new_link, link_messages(args), foreign_keys=["category_id"])
         return make_json_response(201, new_link.to_json())
 
 
+# One link of a bulk import, links are validated one by one so invalid ones fail alone.
+bulk_link_schema = Schema.from_dict({
+    "name": fields.Str(required=True, validate=(
+            Length(min=1, max=50, error="Length must be between [{min}, {max}]."))),
+    "link": fields.Str(required=True, validate=is_url),
+    "categoryId": fields.Int(required=True),
+})()
+
+
+@api.resource('/links/bulk')
+class LinkBulkResource(Resource):
+
+    @admission.limit_concurrency
+    @use_args({
+        "links": fields.List(fields.Raw(), required=True, validate=Length(
+            min=1, max=BULK_MAX_LINKS, error="Length must be between [{min}, {max}].")),
+    }, location="json")
+    def post(self, args):
+        items, conflicts = load_items(bulk_link_schema, args["links"])
+        valid = [index for index, item in enumerate(items) if item is not None]
+        for index, errors in zip(valid, find_bulk_conflicts([items[index] for index in valid])):
+            conflicts[index] = errors
+        rows = [link_row(item) for item, errors in zip(items, conflicts) if not errors]
+        try:
+            with unit_of_work():
+                ids = Link.bulk_insert(rows)
+        except IntegrityError:
+            # Conflicting link was inserted concurrently after the checks, the whole batch
+            # is rolled back, find out which links conflict by inserting them one by one.
+            ids = insert_links_one_by_one(items, conflicts)
+
+        results = []
+        for index, (item, errors) in enumerate(zip(items, conflicts)):
+            if errors:
+                results.append({"index": index, "status": 400, "errors": errors})
+            else:
+                results.append({"index": index, "status": 201, "id": ids[item["name"]]})
+        meta = {"created": len(ids), "failed": len(items) - len(ids)}
+        return make_json_response(201 if len(ids) == len(items) else 207,
+                                  {"results": results}, meta=meta)
+
+
+@api.resource('/links/batch')
+class LinkBatchResource(Resource):
+
+    @use_args({"ids": batch_ids_arg(BATCH_POST_MAX_IDS, "json")}, location="json")
+    def post(self, args):
+        return batch_response("links", args["ids"], links_by_ids)
+
+
+@api.resource('/links/lookup')
+class LinkLookupResource(Resource):
+
+    @response_cache.cached
+    @use_args({
+        "url": fields.Str(required=True, validate=[Length(
+            min=1, max=2000, error="Length must be between [{min}, {max}]."), is_url]),
+    }, location="query")
+    def get(self, args):
+        url = args["url"]
+        # Exact match finds also links which are not backfilled with url hash yet.
+        rows = link_rows_query().filter(or_(
+            Link.url_hash == url_hash(url), Link.url_hash.is_(None) & (Link.link == url))
+        ).limit(1).all()
+        add_cache_tags("links")
+        if not rows:
+            abort(404)
+        link = link_row_serializer(rows[0])
+        add_cache_tags("category:{}".format(link["category"]["id"]))
+        return make_json_response(200, link, meta={"canonicalUrl": canonical_url(url)})
+
+
+@api.resource('/links/search')
+class LinkSearchResource(Resource):
+
+    @response_cache.cached
+    @admission.limit_concurrency
+    @use_args({
+        "q": fields.Str(required=True, validate=(
+                Length(min=1, max=200, error="Length must be between [{min}, {max}]."))),
+        "limit": fields.Int(validate=between(1, 1000), missing=DEFAULT_GET_LIMIT),
+        "after": fields.Str(validate=is_cursor),
+    }, location="query")
+    def get(self, args):
+        after = None
+        if args.get("after") is not None:
+            after = decode_cursor(args["after"])
+            # Search cursor is (score, link id) of the last seen result.
+            if len(after) != 2 or not all(isinstance(value, (int, float))
+                                          and not isinstance(value, bool) for value in after):
+                abort_argument_error("after", "Cursor {} is not search cursor.".format(
+                    args["after"]))
+        ranked = search_index.search(args["q"], args["limit"], after=after)
+        links_by_id = {link.id: link for link in Link.query.options(joinedload(Link.category))
+                       .filter(Link.id.in_([link_id for _, link_id in ranked]))}
+        add_cache_tags("links", *{"category:{}".format(link.category_id)
+                                  for link in links_by_id.values()})
+        result = []
+        with timed("serialize"):
+            for score, link_id in ranked:
+                link = links_by_id.get(link_id)
+                if link is not None:
+                    link_json = link.to_json()
+                    link_json["score"] = score
+                    result.append(link_json)
+        next_cursor = encode_cursor(list(ranked[-1])) if len(ranked) == args["limit"] else None
+        return make_json_response(200, {'links': result}, links={'next': next_cursor})
+
+
+@api.resource('/links/export')
+class LinkExportResource(Resource):
+
+    @admission.limit_concurrency
+    @use_args({
+            "format": fields.Str(missing="json", validate=one_of(["json", "ndjson"])),
+        }, location="query")
+    def get(self, args):
+        query = link_rows_query().filter(Link.active.is_(None)).order_by(Link.id)
+        return stream_links(query, args["format"])
+
+
 @api.resource('/links/<int:link_id>')
 class LinkResource(Resource):
 
+    @response_cache.cached
     @use_args({
             "link_id": fields.Int(validate=gt(0), required=True)
         }, location="view_args")
     def get(self, args, link_id):
         link_id = args['link_id']
-        link = Link.query.filter_by(id=link_id).first_or_404()
+        link = Link.query.options(joinedload(Link.category)).filter_by(id=link_id).first_or_404()
+        add_cache_tags("link:{}".format(link.id), "category:{}".format(link.category_id))
         result = link.to_json()
         return make_json_response(200, result)
 
     @use_args({
             "link_id": fields.Int(validate=gt(0), required=True)
         }, location="view_args")
-    def delete(self, link_id):
-        link = Link.query.filter_by(id=link_id).first_or_404()
+    def delete(self, args, link_id):
+        link = Link.query.filter_by(id=args['link_id']).first_or_404()
         link.delete()
         return make_json_response(202, link.to_json())
 
@@ -111,34 +452,35 @@ class LinkResource(Resource):
         "link": fields.Str(required=True, validate=is_url),
         "categoryId": fields.Int(required=True),
     }, location="json")
-    def put(self, link_id, args):
-        # 1. name is unique
-        if exists_link(except_link_id=link_id, name=args["name"]):
-            raise ValidationError("Link with name: {} already exists.".format(args["name"]))
-        # 2. link is unique
-        if exists_link(except_link_id=link_id, link=args["link"]):
-            raise ValidationError("Link with link: {} already exists.".format(args["link"]))
-        # 3. categoryId exists in db.
-        category = get_category(args["categoryId"])
-        if not category:
-            raise ValidationError("Category with id: {} does not exist.".format(args["categoryId"]))
-        modified_link = Link(name=args["name"], link=args["link"], category=category)
-        modified_link.save()
-        return make_json_response(202, modified_link.to_json())
+    def put(self, view_args, args, link_id):
+        link = Link.query.filter_by(id=view_args['link_id']).first_or_404()
+        link.name = args["name"]
+        link.link = args["link"]
+        link.category_id = args["categoryId"]
+        # Unique name and link and existing categoryId are checked by db constraints.
+        save_or_abort(link, link_messages(args), foreign_keys=["category_id"])
+        return make_json_response(202, link.to_json())
 
 
 @api.resource('/categories')
 class CategoryListResource(Resource):
 
-    @use_args({
-            "limit": fields.Int(validate=between(1, 1000), missing=DEFAULT_GET_LIMIT),
-            "offset": fields.Int(missing=0, validate=gt(0)),
-        }, location="query")
+    @response_cache.cached
+    @admission.limit_concurrency
+    @use_args(dict(paging_args(CATEGORY_ORDERS), **{
+            "ids": batch_ids_arg(BATCH_GET_MAX_IDS, "query"),
+        }), location="query", validate=[not_both_args("after", "offset"),
+                                        not_both_args("ids", "after")])
     def get(self, args):
-        query = apply_limit_and_offset(Category.query, args["limit"], args["offset"])
-        categories = query.filter_by(active=None).all()
-        result = {'categories': [category.to_json(True) for category in categories]}
-        return make_json_response(200, result)
+        if "ids" in args:
+            add_cache_tags("categories")
+            return batch_response("categories", args["ids"], categories_by_ids)
+        query = Category.query.filter_by(active=None)
+        add_cache_tags("categories")
+        categories, next_cursor = paginate_or_abort(query, CATEGORY_ORDERS, args)
+        with timed("serialize"):
+            result = {'categories': [category.to_json(True) for category in categories]}
+        return make_json_response(200, result, links={'next': next_cursor})
 
     @use_args({
         "name": fields.Str(required=True, validate=(
@@ -146,39 +488,39 @@ class CategoryListResource(Resource):
         "parentId": fields.Int(missing=0),
     }, location="json")
     def post(self, args):
-        # 1. name is unique (not in db yet)
-        if exists_category(name=args["name"]):
-            raise ValidationError("Category with name: {} already exists.".format(args["name"]))
-        # 2. parentId exists in db.
-        parent = None
-        if args["parentId"] > 0:
-            parent = get_category(args["parentId"])
-            if not parent:
-                raise ValidationError("Category with id: {} does not exist.".format(
-                    args["parentId"]))
-
-        new_category = Category(name=args["name"], parent_category=parent)
-        new_category.save()
+        # Unique name and existing parentId are checked by db constraints.
+        new_category = Category(name=args["name"], parent_id=args["parentId"] or None)
+        save_or_abort(new_category, category_messages(args), foreign_keys=["parent_id"])
         return make_json_response(201, new_category.to_json())
 
 
+@api.resource('/categories/batch')
+class CategoryBatchResource(Resource):
+
+    @use_args({"ids": batch_ids_arg(BATCH_POST_MAX_IDS, "json")}, location="json")
+    def post(self, args):
+        return batch_response("categories", args["ids"], categories_by_ids)
+
+
 @api.resource('/categories/<int:category_id>')
 class CategoryResource(Resource):
 
+    @response_cache.cached
     @use_args({
         "category_id": fields.Int(validate=gt(0), required=True)
     }, location="view_args")
     def get(self, args, category_id):
         category_id = args['category_id']
         category = Category.query.filter_by(id=category_id).first_or_404()
+        add_cache_tags("category:{}".format(category.id))
         result = category.to_json()
         return make_json_response(200, result)
 
     @use_args({
         "category_id": fields.Int(validate=gt(0), required=True)
     }, location="view_args")
-    def delete(self, category_id):
-        category = Category.query.filter_by(id=category_id).first_or_404()
+    def delete(self, args, category_id):
+        category = Category.query.filter_by(id=args['category_id']).first_or_404()
         category.delete()
         return make_json_response(202, category.to_json())
 
@@ -190,18 +532,138 @@ class CategoryResource(Resource):
                 Length(min=1, max=50, error="Length must be between [{min}, {max}]."))),
         "parentId": fields.Int(missing=0),
     }, location="json")
-    def put(self, category_id, args):
-        # 1. name is unique
-        if exists_category(except_category_id=category_id, name=args["name"]):
-            raise ValidationError("Category with name: {} already exists.".format(args["name"]))
-        # 3. parentId exists in db.
-        parent = get_category(args["parentId"])
-        if not parent:
-            raise ValidationError("Category with id: {} does not exist.".format(args["parentId"]))
-        modified_category = Category(name=args["name"], parent_category=parent)
-        modified_category.save()
-        return make_json_response(202, modified_category.to_json())
+    def put(self, view_args, args, category_id):
+        category_id = view_args['category_id']
+        parent_id = args["parentId"] or None
+        if parent_id is not None:
+            path = category_tree.path(parent_id) or []
+            if any(node.id == category_id for node in path):
+                abort_argument_error("parentId", "Category with id: {} is a descendant of "
+                                                 "category with id: {}.".format(parent_id,
+                                                                                category_id))
+        category = Category.query.filter_by(id=category_id).first_or_404()
+        category.name = args["name"]
+        category.parent_id = parent_id
+        # Unique name and existing parentId are checked by db constraints.
+        save_or_abort(category, category_messages(args), foreign_keys=["parent_id"])
+        return make_json_response(202, category.to_json())
+
+
+@api.resource('/categories/<int:category_id>/subtree')
+class CategorySubtreeResource(Resource):
+
+    @use_args({
+        "category_id": fields.Int(validate=gt(0), required=True)
+    }, location="view_args")
+    def get(self, args, category_id):
+        subtree = category_tree.subtree(args['category_id'])
+        if not subtree:
+            abort(404)
+        categories = []
+        for depth, node in subtree:
+            category_json = node.to_json()
+            category_json["parentId"] = node.parent_id
+            category_json["depth"] = depth
+            categories.append(category_json)
+        return make_json_response(200, {'categories': categories})
+
+
+@api.resource('/categories/<int:category_id>/path')
+class CategoryPathResource(Resource):
+
+    @use_args({
+        "category_id": fields.Int(validate=gt(0), required=True)
+    }, location="view_args")
+    def get(self, args, category_id):
+        path = category_tree.path(args['category_id'])
+        if path is None:
+            abort(404)
+        return make_json_response(200, {'categories': [node.to_json() for node in path]})
+
+
+@api.resource('/categories/<int:category_id>/stats')
+class CategoryStatsResource(Resource):
+
+    @response_cache.cached
+    @use_args({
+        "category_id": fields.Int(validate=gt(0), required=True)
+    }, location="view_args")
+    def get(self, args, category_id):
+        category_id = args['category_id']
+        # Category and its active children with their counters, no links are counted here.
+        rows = Category.query.with_entities(
+            Category.id, Category.name, Category.link_count, Category.total_link_count
+        ).filter(or_(
+                Category.id == category_id,
+                (Category.parent_id == category_id) & Category.active.is_(None))
+        ).order_by(Category.id).all()
+        add_cache_tags("categories", "category:{}".format(category_id))
+        stats = {row.id: {
+            "id": row.id,
+            "name": row.name,
+            "linkCount": row.link_count,
+            "totalLinkCount": row.total_link_count,
+        } for row in rows}
+        if category_id not in stats:
+            abort(404)
+        result = stats.pop(category_id)
+        result["children"] = list(stats.values())
+        return make_json_response(200, result)
+
+
+def change_id_or_abort(token):
+    if token is None:
+        return 0
+    values = decode_cursor(token)
+    if len(values) != 1 or not isinstance(values[0], int) or isinstance(values[0], bool):
+        abort_argument_error("since", "Malformed token {}.".format(token))
+    return values[0]
+
+
+def changed_objects(changes):
+    """
+    Dict (entity, id) -> current json of objects in `changes`, with one query per entity.
+    """
+    ids = {"link": set(), "category": set()}
+    for change in changes:
+        ids[change.entity].add(change.entity_id)
+    result = {}
+    if ids["link"]:
+        result.update((("link", link_id), link_json)
+                      for link_id, link_json in links_by_ids(ids["link"]).items())
+    if ids["category"]:
+        result.update((("category", category_id), category_json) for category_id, category_json
+                      in categories_by_ids(ids["category"]).items())
+    return result
+
+
+@api.resource('/changes')
+class ChangeListResource(Resource):
+
+    @use_args({
+        "since": fields.Str(validate=is_cursor),
+        "limit": fields.Int(validate=between(1, 1000), missing=DEFAULT_GET_LIMIT),
+    }, location="query")
+    def get(self, args):
+        since = change_id_or_abort(args.get("since"))
+        changes, has_more = change_log.since(db.session, since, args["limit"])
+        objects = changed_objects(changes)
+        result = []
+        for change in changes:
+            result.append({
+                "token": encode_cursor([change.id]),
+                "type": change.entity,
+                "id": change.entity_id,
+                "action": change.action,
+                "changed": change.created,
+                # Current state, which may be newer than the change.
+                change.entity: objects.get((change.entity, change.entity_id)),
+            })
+        next_token = encode_cursor([changes[-1].id if changes else since])
+        return make_json_response(200, {"changes": result}, links={"next": next_token},
+                                  meta={"hasMore": has_more})
 
 
 def register(app, **kwargs):
+    init_models(app)
     app.register_blueprint(blueprint, **kwargs)
@@ -0,0 +1,225 @@
+"""
+Process-local inverted index for searching links by name and url.
+
+Names and urls are split into lower case alphanumeric tokens. Each field has its own
+inverted index (token -> set of link ids) and sorted list of tokens, so prefix of
+a token is found by bisection instead of scanning all links.
+
+Every query token must match a token of the link name or url, either exactly or as
+a prefix. Results are ranked by sum of weights of the best match of every query token,
+ties are ordered by link id.
+
+The index is patched by `Link.save` / `Link.delete` / `Link.bulk_insert`. Writes done
+by other processes are picked up after `Config.SEARCH_INDEX_TTL` seconds, when
+the index is reloaded. The new index is built without holding the lock, searches use
+the old one meanwhile, and it is swapped in together with patches made since the
+build started.
+"""
+
+import bisect
+import heapq
+import re
+import threading
+import time
+
+from config import Config
+
+NAME_EXACT_WEIGHT = 4
+NAME_PREFIX_WEIGHT = 2
+LINK_EXACT_WEIGHT = 2
+LINK_PREFIX_WEIGHT = 1
+
+# Tokens shorter than this are matched only exactly, prefixes would match most of the index.
+MIN_PREFIX_LENGTH = 2
+
+# Url parts which are in almost every link and are useless for search.
+URL_STOP_TOKENS = frozenset(('http', 'https', 'www'))
+
+_token_re = re.compile(r'[^\W_]+', re.UNICODE)
+
+
+def tokenize(text):
+    return _token_re.findall(text.lower()) if text else []
+
+
+class _FieldIndex:
+
+    def __init__(self):
+        self.postings = {}
+        self.tokens = []
+
+    def add(self, link_id, tokens):
+        for token in tokens:
+            ids = self.postings.get(token)
+            if ids is None:
+                ids = self.postings[token] = set()
+                bisect.insort(self.tokens, token)
+            ids.add(link_id)
+
+    def remove(self, link_id, tokens):
+        for token in tokens:
+            ids = self.postings.get(token)
+            if ids is None:
+                continue
+            ids.discard(link_id)
+            if not ids:
+                del self.postings[token]
+                del self.tokens[bisect.bisect_left(self.tokens, token)]
+
+    def rebuild(self, documents):
+        self.postings = {}
+        for link_id, tokens in documents:
+            for token in tokens:
+                self.postings.setdefault(token, set()).add(link_id)
+        self.tokens = sorted(self.postings)
+
+    def match(self, query_token, exact_weight, prefix_weight, scores):
+        """
+        Update `scores` (link id -> best weight) with links matching `query_token`.
+        """
+        for link_id in self.postings.get(query_token, ()):
+            if scores.get(link_id, 0) < exact_weight:
+                scores[link_id] = exact_weight
+        if len(query_token) < MIN_PREFIX_LENGTH:
+            return
+        position = bisect.bisect_right(self.tokens, query_token)
+        while position < len(self.tokens) and self.tokens[position].startswith(query_token):
+            for link_id in self.postings[self.tokens[position]]:
+                if scores.get(link_id, 0) < prefix_weight:
+                    scores[link_id] = prefix_weight
+            position += 1
+
+
+class LinkSearchIndex:
+
+    def __init__(self, model, ttl=Config.SEARCH_INDEX_TTL):
+        self.model = model
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        # Held by the thread rebuilding the index.
+        self._load_lock = threading.Lock()
+        self._loaded_at = None
+        # Patches made while the index is being rebuilt, replayed on the new index.
+        self._pending = None
+        self._documents = {}
+        self._names = _FieldIndex()
+        self._links = _FieldIndex()
+
+    @staticmethod
+    def _document(name, link):
+        return (tuple(set(tokenize(name))),
+                tuple(set(tokenize(link)) - URL_STOP_TOKENS))
+
+    def _rebuild(self, rows):
+        # Caller holds `_load_lock`. Patches are recorded before `rows` (query) are read,
+        # so the ones the rows miss are replayed, the others are applied again harmlessly.
+        with self._lock:
+            self._pending = []
+        try:
+            documents = {link_id: self._document(name, link) for link_id, name, link in rows}
+            names = _FieldIndex()
+            names.rebuild((link_id, doc[0]) for link_id, doc in documents.items())
+            links = _FieldIndex()
+            links.rebuild((link_id, doc[1]) for link_id, doc in documents.items())
+            with self._lock:
+                self._documents, self._names, self._links = documents, names, links
+                for patch in self._pending:
+                    self._apply(*patch)
+                self._loaded_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._pending = None
+
+    def _rows(self):
+        model = self.model
+        return (model.query.with_entities(model.id, model.name, model.link)
+                .filter(model.active.is_(None)).yield_per(10000))
+
+    def load_rows(self, rows):
+        """
+        Build the index from (id, name, link) tuples of active links.
+        """
+        with self._load_lock:
+            self._rebuild(rows)
+
+    def load(self):
+        """
+        (Re)load the whole index from the database with a single query.
+        """
+        with self._load_lock:
+            self._rebuild(self._rows())
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def _is_stale(self):
+        loaded_at = self._loaded_at
+        return loaded_at is None or bool(self.ttl and time.monotonic() - loaded_at > self.ttl)
+
+    def _ensure_loaded(self):
+        if not self._is_stale():
+            return
+        if self._loaded_at is None:
+            self._load_lock.acquire()
+        elif not self._load_lock.acquire(blocking=False):
+            # Another thread rebuilds the index, search the old one meanwhile.
+            return
+        try:
+            if self._is_stale():
+                self._rebuild(self._rows())
+        finally:
+            self._load_lock.release()
+
+    def _remove(self, link_id):
+        document = self._documents.pop(link_id, None)
+        if document is not None:
+            self._names.remove(link_id, document[0])
+            self._links.remove(link_id, document[1])
+
+    def update(self, link_id, name, link, active=None):
+        """
+        Insert, patch or (for inactive link) remove link from the index.
+        """
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((link_id, name, link, active))
+            if self._loaded_at is not None:
+                self._apply(link_id, name, link, active)
+
+    def _apply(self, link_id, name, link, active):
+        self._remove(link_id)
+        if active is not None:
+            return
+        document = self._documents[link_id] = self._document(name, link)
+        self._names.add(link_id, document[0])
+        self._links.add(link_id, document[1])
+
+    def search(self, query, limit, after=None):
+        """
+        Find links matching all tokens of `query`.
+        Returns list of (score, link_id) tuples ordered by rank, at most `limit` of them,
+        starting after position `after` which is (score, link_id) tuple of the last seen result.
+        """
+        query_tokens = list(dict.fromkeys(tokenize(query)))
+        if not query_tokens:
+            return []
+        self._ensure_loaded()
+        with self._lock:
+            total = None
+            for query_token in query_tokens:
+                scores = {}
+                self._names.match(query_token, NAME_EXACT_WEIGHT, NAME_PREFIX_WEIGHT, scores)
+                self._links.match(query_token, LINK_EXACT_WEIGHT, LINK_PREFIX_WEIGHT, scores)
+                if total is None:
+                    total = scores
+                else:
+                    total = {link_id: total[link_id] + score
+                             for link_id, score in scores.items() if link_id in total}
+                if not total:
+                    return []
+        ranked = ((-score, link_id) for link_id, score in total.items())
+        if after is not None:
+            last_seen = (-after[0], after[1])
+            ranked = (key for key in ranked if key > last_seen)
+        return [(-score, link_id) for score, link_id in heapq.nsmallest(limit, ranked)]
@@ -0,0 +1,190 @@
+"""
+Process-local index of the category hierarchy.
+
+Categories form adjacency list through `parent_id`. Walking it through the database
+costs a query per level, so the whole hierarchy is loaded once into memory:
+
+* id -> node,
+* parent id -> sorted list of children ids,
+* id -> precomputed path of ancestor ids (from the root).
+
+The index is patched incrementally by `Category.save` / `Category.delete`. Writes done
+by other processes are picked up after `Config.CATEGORY_TREE_TTL` seconds, when
+the index is reloaded, or sooner when an id missing in the index is looked up
+(at most one such reload per `MISS_RELOAD_INTERVAL` seconds).
+"""
+
+import bisect
+import threading
+import time
+
+from config import Config
+
+# Minimal seconds between reloads caused by lookups of ids missing in the index.
+MISS_RELOAD_INTERVAL = 1
+
+
+class CategoryNode:
+
+    __slots__ = ('id', 'name', 'parent_id', 'active', 'created')
+
+    def __init__(self, id, name, parent_id, active, created):
+        self.id = id
+        self.name = name
+        self.parent_id = parent_id
+        self.active = active
+        self.created = created
+
+    def to_json(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "active": self.active is None,
+            "created": self.created,
+        }
+
+    def __repr__(self):
+        return '<CategoryNode id=%d name=%r>' % (self.id, self.name)
+
+
+class CategoryTree:
+
+    def __init__(self, model, ttl=Config.CATEGORY_TREE_TTL,
+                 miss_reload_interval=MISS_RELOAD_INTERVAL):
+        self.model = model
+        self.ttl = ttl
+        self.miss_reload_interval = miss_reload_interval
+        self._lock = threading.RLock()
+        self._loaded_at = None
+        self._nodes = {}
+        self._children = {}
+        self._paths = {}
+
+    def load(self):
+        """
+        (Re)load the whole hierarchy from the database with a single query.
+        """
+        model = self.model
+        rows = model.query.with_entities(
+            model.id, model.name, model.parent_id, model.active, model.created).all()
+        with self._lock:
+            self._nodes = {row[0]: CategoryNode(*row) for row in rows}
+            self._children = {}
+            for node_id in sorted(self._nodes):
+                self._children.setdefault(self._nodes[node_id].parent_id, []).append(node_id)
+            self._paths = {}
+            for node_id in self._children.get(None, []):
+                self._compute_paths(node_id)
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def _ensure_loaded(self):
+        loaded_at = self._loaded_at
+        if loaded_at is None or (self.ttl and time.monotonic() - loaded_at > self.ttl):
+            self.load()
+
+    def _ensure_known(self, category_id):
+        """
+        Load the index, reload it when `category_id` is not in it (category may be
+        created by another process since the last load). Returns whether it is known.
+        """
+        self._ensure_loaded()
+        if category_id in self._nodes:
+            return True
+        if time.monotonic() - self._loaded_at >= self.miss_reload_interval:
+            self.load()
+        return category_id in self._nodes
+
+    def _compute_paths(self, root_id):
+        parent_id = self._nodes[root_id].parent_id
+        base = () if parent_id is None else self._paths.get(parent_id, ()) + (parent_id, )
+        stack = [(root_id, base)]
+        while stack:
+            node_id, ancestors = stack.pop()
+            if node_id in ancestors:
+                # Cycle in the data, do not loop forever.
+                continue
+            self._paths[node_id] = ancestors
+            child_ancestors = ancestors + (node_id, )
+            stack.extend((child_id, child_ancestors)
+                         for child_id in self._children.get(node_id, []))
+
+    def update(self, category):
+        """
+        Insert or patch node of saved `category`, moving its subtree if parent changed.
+        """
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            node = self._nodes.get(category.id)
+            if node is None:
+                node = CategoryNode(category.id, category.name, category.parent_id,
+                                    category.active, category.created)
+                self._nodes[node.id] = node
+                bisect.insort(self._children.setdefault(node.parent_id, []), node.id)
+            else:
+                old_parent_id = node.parent_id
+                node.name = category.name
+                node.active = category.active
+                node.created = category.created
+                if old_parent_id == category.parent_id:
+                    return
+                self._children[old_parent_id].remove(node.id)
+                node.parent_id = category.parent_id
+                bisect.insort(self._children.setdefault(node.parent_id, []), node.id)
+            if node.parent_id is not None and node.parent_id not in self._nodes:
+                # Parent is not known yet (created by another process), load everything again.
+                self._loaded_at = None
+                return
+            self._compute_paths(node.id)
+
+    def get(self, category_id):
+        """
+        Node of category with `category_id` or None.
+        """
+        with self._lock:
+            self._ensure_known(category_id)
+            return self._nodes.get(category_id)
+
+    def children(self, category_id):
+        with self._lock:
+            self._ensure_loaded()
+            return [self._nodes[child_id] for child_id in self._children.get(category_id, [])]
+
+    def path(self, category_id):
+        """
+        List of nodes from the root to category with `category_id` (including it).
+        Returns None if category does not exist.
+        """
+        with self._lock:
+            if not self._ensure_known(category_id):
+                return None
+            ancestors = self._paths.get(category_id, ())
+            return [self._nodes[node_id] for node_id in ancestors + (category_id, )]
+
+    def subtree(self, category_id, include_inactive=False):
+        """
+        List of (depth, node) tuples of category with `category_id` and all its descendants
+        in depth-first order. Inactive categories are skipped together with their descendants
+        unless `include_inactive` is set.
+        Returns None if category does not exist.
+        """
+        with self._lock:
+            if not self._ensure_known(category_id):
+                return None
+            result = []
+            stack = [(0, category_id)]
+            seen = set()
+            while stack:
+                depth, node_id = stack.pop()
+                node = self._nodes[node_id]
+                if node_id in seen or (node.active is not None and not include_inactive):
+                    continue
+                seen.add(node_id)
+                result.append((depth, node))
+                stack.extend((depth + 1, child_id)
+                             for child_id in reversed(self._children.get(node_id, [])))
+            return result
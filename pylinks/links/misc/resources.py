@@ -0,0 +1,49 @@
+from flask_restful import Resource, Api
+from flask import Blueprint, make_response
+
+from lib.response import make_json_response
+from lib.pool import pool_status
+from links import db, response_cache, request_metrics, read_replicas, admission
+
+
+blueprint = Blueprint('misc', __name__)
+api = Api(blueprint)
+
+
+@api.resource('/cache')
+class CacheStatsResource(Resource):
+
+    def get(self):
+        return make_json_response(200, {'responseCache': response_cache.stats()})
+
+
+@api.resource('/pool')
+class PoolStatsResource(Resource):
+
+    def get(self):
+        result = {'pool': pool_status(db.engine)}
+        if read_replicas.bind_keys:
+            result.update(read_replicas.status())
+            for replica in result['replicas']:
+                replica['pool'] = pool_status(db.engines[replica['bind']])
+        return make_json_response(200, result)
+
+
+@api.resource('/admission')
+class AdmissionStatsResource(Resource):
+
+    def get(self):
+        return make_json_response(200, {'admission': admission.stats()})
+
+
+@api.resource('/metrics')
+class MetricsResource(Resource):
+
+    def get(self):
+        response = make_response(request_metrics.render(), 200)
+        response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+        return response
+
+
+def register(app, **kwargs):
+    app.register_blueprint(blueprint, **kwargs)
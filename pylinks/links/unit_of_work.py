@@ -0,0 +1,110 @@
+"""
+Unit of work grouping several writes into one transaction.
+
+Outside of `unit_of_work` every `Model.save` / `Model.delete` commits on its own
+(same as before). Inside of it objects are only added to the session and flushed in
+batches of `flush_size` (`UNIT_OF_WORK_FLUSH_SIZE` of app config by default), everything
+is committed once when the block ends (or rolled back when it raises). Work which must happen only after a successful
+commit (cache invalidation, in-memory indexes) is deferred until then.
+
+Nested `unit_of_work` blocks join the outermost one.
+
+Example usage::
+    with unit_of_work():
+        category.save()
+        for link in links:
+            link.save()
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import current_app
+from links import db
+
+_current = ContextVar('unit_of_work', default=None)
+
+
+class UnitOfWork:
+
+    def __init__(self, session, flush_size):
+        self.session = session
+        self.flush_size = flush_size
+        self._pending = 0
+        self._after_commit = []
+
+    def add(self, obj):
+        self.session.add(obj)
+        self._pending += 1
+        if self._pending >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        self.session.flush()
+        self._pending = 0
+
+    def after_commit(self, callback):
+        self._after_commit.append(callback)
+
+    def commit(self):
+        # Callbacks read attributes of committed objects, keep them loaded instead of
+        # reloading every object with its own SELECT.
+        expire_on_commit = self.session.expire_on_commit
+        self.session.expire_on_commit = False
+        try:
+            self.session.commit()
+        finally:
+            self.session.expire_on_commit = expire_on_commit
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            callback()
+
+    def rollback(self):
+        self.session.rollback()
+        self._after_commit = []
+
+
+@contextmanager
+def unit_of_work(flush_size=None):
+    outer = _current.get()
+    if outer is not None:
+        yield outer
+        return
+    if flush_size is None:
+        flush_size = current_app.config['UNIT_OF_WORK_FLUSH_SIZE']
+    uow = UnitOfWork(db.session(), flush_size)
+    token = _current.set(uow)
+    try:
+        yield uow
+        uow.commit()
+    except BaseException:
+        uow.rollback()
+        raise
+    finally:
+        _current.reset(token)
+
+
+def commit(after_commit=None):
+    """
+    Commit current session, or defer the commit to the running unit of work.
+    `after_commit` callback is run once the data is committed.
+    """
+    uow = _current.get()
+    if uow is None:
+        db.session.commit()
+        if after_commit is not None:
+            after_commit()
+    elif after_commit is not None:
+        uow.after_commit(after_commit)
+
+
+def persist(obj, after_commit=None):
+    """
+    Add `obj` to the session and commit it, see `commit`.
+    """
+    uow = _current.get()
+    if uow is None:
+        db.session.add(obj)
+    else:
+        uow.add(obj)
+    commit(after_commit)
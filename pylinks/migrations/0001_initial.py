@@ -0,0 +1,58 @@
+"""
+Initial schema (tables created by db.create_all before migrations existed).
+"""
+
+from sqlalchemy import (MetaData, Table, Column, Integer, String, DateTime, Boolean, Float,
+                        ForeignKey, func)
+
+metadata = MetaData()
+
+Table(
+    'user', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(100), unique=True),
+    Column('email', String(100), unique=True),
+    Column('password', String(50)),
+    Column('superadmin', Boolean),
+    Column('active', DateTime, nullable=True),
+    Column('created', DateTime),
+)
+
+Table(
+    'role', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(64), unique=True),
+)
+
+Table(
+    'category', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('name', String(50), unique=True),
+    Column('parent_id', Integer, ForeignKey('category.id'), nullable=True),
+    Column('active', DateTime, nullable=True),
+    Column('created', DateTime, default=func.now()),
+)
+
+Table(
+    'link', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('name', String(50), unique=True),
+    Column('link', String(100), unique=True),
+    Column('category_id', Integer, ForeignKey('category.id')),
+    Column('active', DateTime, nullable=True),
+    Column('created', DateTime, default=func.now()),
+)
+
+Table(
+    'link_check', metadata,
+    Column('link_id', Integer, ForeignKey('link.id'), primary_key=True),
+    Column('status', Integer, nullable=True),
+    Column('latency', Float, nullable=True),
+    Column('error', String(200), nullable=True),
+    Column('checked', DateTime, nullable=False),
+)
+
+
+def upgrade(connection):
+    # Existing databases already have (some of) the tables.
+    metadata.create_all(connection, checkfirst=True)
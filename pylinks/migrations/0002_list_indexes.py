@@ -0,0 +1,45 @@
+"""
+Indexes for list endpoints, Link-Category join and category children lookups.
+"""
+
+from sqlalchemy import MetaData, Table, Column, Integer, DateTime, Index
+
+from lib.migrate import create_index, drop_index
+
+metadata = MetaData()
+
+category = Table(
+    'category', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('parent_id', Integer),
+    Column('active', DateTime),
+    Column('created', DateTime),
+)
+
+link = Table(
+    'link', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('category_id', Integer),
+    Column('active', DateTime),
+    Column('created', DateTime),
+)
+
+INDEXES = [
+    # `active IS NULL` filter with keyset / offset paging by id or created.
+    Index('ix_link_active_id', link.c.active, link.c.id),
+    Index('ix_link_active_created', link.c.active, link.c.created, link.c.id),
+    Index('ix_link_category_id', link.c.category_id),
+    Index('ix_category_active_id', category.c.active, category.c.id),
+    Index('ix_category_active_created', category.c.active, category.c.created, category.c.id),
+    Index('ix_category_parent_id', category.c.parent_id),
+]
+
+
+def upgrade(connection):
+    for index in INDEXES:
+        create_index(connection, index)
+
+
+def downgrade(connection):
+    for index in reversed(INDEXES):
+        drop_index(connection, index)
@@ -0,0 +1,63 @@
+"""
+Link counts of categories (own and including descendants), filled from existing links.
+"""
+
+from sqlalchemy import (MetaData, Table, Column, Integer, DateTime, inspect, select, func,
+                        bindparam, text)
+
+metadata = MetaData()
+
+category = Table(
+    'category', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('parent_id', Integer),
+    Column('link_count', Integer),
+    Column('total_link_count', Integer),
+)
+
+link = Table(
+    'link', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('category_id', Integer),
+    Column('active', DateTime),
+)
+
+COLUMNS = ['link_count', 'total_link_count']
+
+
+def _columns(connection):
+    return {column['name'] for column in inspect(connection).get_columns('category')}
+
+
+def upgrade(connection):
+    existing = _columns(connection)
+    for name in COLUMNS:
+        if name not in existing:
+            connection.execute(text(
+                'ALTER TABLE category ADD COLUMN {} INTEGER NOT NULL DEFAULT 0'.format(name)))
+
+    counts = dict(connection.execute(
+        select(link.c.category_id, func.count(link.c.id))
+        .where(link.c.active.is_(None), link.c.category_id.isnot(None))
+        .group_by(link.c.category_id)).all())
+    parents = dict(connection.execute(select(category.c.id, category.c.parent_id)).all())
+    totals = dict.fromkeys(parents, 0)
+    for category_id, count in counts.items():
+        seen = set()
+        while category_id in totals and category_id not in seen:
+            seen.add(category_id)
+            totals[category_id] += count
+            category_id = parents[category_id]
+    if totals:
+        connection.execute(
+            category.update().where(category.c.id == bindparam('category_id')).values(
+                link_count=bindparam('own'), total_link_count=bindparam('total')),
+            [{"category_id": category_id, "own": counts.get(category_id, 0), "total": total}
+             for category_id, total in totals.items()])
+
+
+def downgrade(connection):
+    existing = _columns(connection)
+    for name in reversed(COLUMNS):
+        if name in existing:
+            connection.execute(text('ALTER TABLE category DROP COLUMN {}'.format(name)))
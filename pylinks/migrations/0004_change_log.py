@@ -0,0 +1,38 @@
+"""
+Change log of links and categories (GET /changes), filled with creates of existing rows.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import MetaData, Table, Column, Integer, String, DateTime, select, literal
+
+metadata = MetaData()
+
+change_log = Table(
+    'change_log', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('entity', String(20), nullable=False),
+    Column('entity_id', Integer, nullable=False),
+    Column('action', String(10), nullable=False),
+    Column('created', DateTime, nullable=False),
+)
+
+category = Table('category', metadata, Column('id', Integer, primary_key=True))
+link = Table('link', metadata, Column('id', Integer, primary_key=True))
+
+
+def upgrade(connection):
+    change_log.create(connection, checkfirst=True)
+    if connection.execute(select(change_log.c.id).limit(1)).first() is not None:
+        return
+    now = datetime.now()
+    # Categories first, so that replaying the log never meets a link of unknown category.
+    for entity, table in (('category', category), ('link', link)):
+        connection.execute(change_log.insert().from_select(
+            ['entity', 'entity_id', 'action', 'created'],
+            select(literal(entity), table.c.id, literal('create'), literal(now))
+            .order_by(table.c.id)))
+
+
+def downgrade(connection):
+    change_log.drop(connection, checkfirst=True)
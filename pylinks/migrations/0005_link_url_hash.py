@@ -0,0 +1,35 @@
+"""
+Hash of canonical link url with unique index, existing rows are filled by links.link.backfill.
+"""
+
+from sqlalchemy import MetaData, Table, Column, Integer, BigInteger, Index, inspect, text
+
+from lib.migrate import create_index, drop_index
+
+metadata = MetaData()
+
+link = Table(
+    'link', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('url_hash', BigInteger),
+)
+
+INDEX = Index('uq_link_url_hash', link.c.url_hash, unique=True)
+
+
+def _has_column(connection):
+    return 'url_hash' in {column['name'] for column in inspect(connection).get_columns('link')}
+
+
+def upgrade(connection):
+    # Nullable column without default is added without rewriting the table, rows are
+    # hashed in bounded batches by the backfill job instead of one long transaction.
+    if not _has_column(connection):
+        connection.execute(text('ALTER TABLE link ADD COLUMN url_hash BIGINT'))
+    create_index(connection, INDEX)
+
+
+def downgrade(connection):
+    drop_index(connection, INDEX)
+    if _has_column(connection):
+        connection.execute(text('ALTER TABLE link DROP COLUMN url_hash'))
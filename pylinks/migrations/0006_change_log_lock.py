@@ -0,0 +1,23 @@
+"""
+Lock row of the change log, writers hold it until commit so change ids follow commit order.
+"""
+
+from sqlalchemy import MetaData, Table, Column, Integer, BigInteger, select
+
+metadata = MetaData()
+
+change_log_lock = Table(
+    'change_log_lock', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=False),
+    Column('version', BigInteger, nullable=False),
+)
+
+
+def upgrade(connection):
+    change_log_lock.create(connection, checkfirst=True)
+    if connection.execute(select(change_log_lock.c.id)).first() is None:
+        connection.execute(change_log_lock.insert().values(id=1, version=0))
+
+
+def downgrade(connection):
+    change_log_lock.drop(connection, checkfirst=True)
@@ -0,0 +1,8 @@
+"""
+Versioned schema migrations, see `lib.migrate`.
+
+Usage (from pylinks directory)::
+    python -m migrations status
+    python -m migrations upgrade [--target VERSION]
+    python -m migrations downgrade --target VERSION
+"""
@@ -0,0 +1,37 @@
+import argparse
+
+from lib.migrate import Migrator
+from links import create_app, db
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Versioned schema migrations.")
+    arg_parser.add_argument('command', choices=['status', 'upgrade', 'downgrade'])
+    arg_parser.add_argument('--target', help='version to upgrade / downgrade to')
+    options = arg_parser.parse_args()
+    if options.command == 'downgrade' and options.target is None:
+        arg_parser.error('downgrade requires --target')
+
+    app = create_app(modules=[])
+    with app.app_context():
+        migrator = Migrator(db.engine, 'migrations')
+        if options.command == 'status':
+            applied = migrator.applied()
+            for migration in migrator.migrations():
+                print('{} {:<8} {}'.format(
+                    migration.version, 'applied' if migration.version in applied else 'pending',
+                    migration.description))
+            return
+        try:
+            if options.command == 'upgrade':
+                for migration in migrator.upgrade(options.target):
+                    print('applied {} {}'.format(migration.version, migration.description))
+            else:
+                for migration in migrator.downgrade(options.target):
+                    print('reverted {} {}'.format(migration.version, migration.description))
+        except ValueError as err:
+            arg_parser.error(str(err))
+
+
+if __name__ == '__main__':
+    main()
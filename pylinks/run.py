@@ -1,8 +1,3 @@
-from links import app
-from links.link import resources as link_resources
+from wsgi import app
 
-modules = [link_resources, ]
-
-for module in modules:
-    module.register(app, url_prefix='/api/v1')
 app.run(debug=True)
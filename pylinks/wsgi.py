@@ -0,0 +1,8 @@
+"""
+WSGI application with all modules registered, used by production servers
+(`gunicorn -c gunicorn.conf.py wsgi:app`) and by run.py.
+"""
+
+from links import create_app
+
+app = create_app()